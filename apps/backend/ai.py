@@ -1,19 +1,50 @@
+import asyncio
+import hashlib
 import json
 import os
+from time import monotonic
 from typing import Optional, Dict, Any
 
-from openai import OpenAI
+from openai import AsyncOpenAI
 from pydantic import ValidationError, TypeAdapter
 from fastapi import HTTPException
 
-from schemas import ProgramResponse
-
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-
-SYSTEM = """You are a fitness coach assistant that outputs ONLY valid JSON.
-No markdown, no code fences, no extra keys, no commentary.
-
-You must output exactly ONE JSON object, and nothing else.
+from schemas import AIProgramRequest, ProgramOK, ProgramResponse
+from ai_precheck import precheck
+from ai_repair import repair_program_json
+from ai_schema import PROGRAM_TEXT_FORMAT, RESPONSE_KEY
+from ai_usage import AI_MODEL, AI_OUTPUT_TOKENS_MAX, expected_days, output_budget, record_call
+from ai_cache import cache_key, canonical_preferences, normalize_text, program_cache
+from core.hedge import Hedger
+from core.metrics import registry
+from core.singleflight import SingleFlight
+
+client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+
+# Caps concurrent upstream calls per process; waiting requests park on the event loop, not a thread.
+AI_MAX_CONCURRENCY = int(os.getenv("AI_MAX_CONCURRENCY", "32"))
+_llm_slots = asyncio.Semaphore(AI_MAX_CONCURRENCY)
+
+# Identical requests arriving while a generation is running share its result.
+_flights = SingleFlight()
+
+# Optional hedging: a duplicate call is started when the first one is slower than AI_HEDGE_DELAY_MS
+# (milliseconds, or "auto" for the observed p90). AI_HEDGE_MAX_FRACTION bounds the extra spend.
+_hedger = Hedger(
+    delay_ms=os.getenv("AI_HEDGE_DELAY_MS", "0"),
+    max_fraction=float(os.getenv("AI_HEDGE_MAX_FRACTION", "0.1")),
+)
+
+registry.stats_counter(
+    "ai_singleflight_total", "Generations run (leaders) or joined (followers).", _flights.stats, "role"
+)
+registry.stats_counter("ai_hedge_total", "Hedged LLM calls.", _hedger.stats)
+_llm_retries = registry.counter("llm_retries_total", "Generation attempts retried, by reason.", ["reason"])
+_llm_repairs = registry.counter(
+    "llm_repairs_total", "Invalid program JSON fixed locally or by a repair call.", ["method"]
+)
+
+SYSTEM = """You are a fitness coach assistant. Your output is constrained to the ProgramResponse JSON schema.
 
 Your job is to either:
 - Return a structured workout program (status="ok"), OR
@@ -25,23 +56,14 @@ Reject if:
 - The request is too vague to build a plan (e.g., "hi", "help", "make a plan" with no details) AND there are no usable preferences.
 
 If rejected:
-- status must be "rejected"
-- code must be "NOT_FITNESS" or "TOO_VAGUE"
+- code is "NOT_FITNESS" or "TOO_VAGUE"
 - message must be short and clear
 - hints should contain 1 to 3 concrete suggestions.
 
 If ok:
-- status must be "ok"
-- days must be a list sorted by day ascending
-- day starts at 1
-- Provide warmup, cooldown, equipment list, estimated_calories, and exercises.
+- days sorted by day ascending, starting at 1
 - focus must be very short (e.g., "upper body", "cardio", "full body").
-
-Schema rules:
-- Top-level keys must be exactly: status, days (no other keys).
-- Each day must include ALL keys: day, focus, intensity, duration_minutes, equipment, warmup, exercises, cooldown, estimated_calories.
-- Each exercise must include EXACT keys: name, sets, reps, rest_seconds. Use "reps" for both reps or time (e.g., "45s" or "8-12" or "1 min on / 30s off"). Do NOT use "reps_or_time".
-- Do not output any extra keys anywhere.
+- reps holds reps or time (e.g., "8-12", "45s", "1 min on / 30s off").
 
 Hard limits:
 - Output at most 7 days.
@@ -50,24 +72,27 @@ Hard limits:
 - For warmup and cooldown: max 3 items each.
 - For equipment: max 5 items.
 - For exercises: 4 to 6 exercises per day.
-Keep strings short (<= 60 chars).
-
-Do not provide reasoning. Output the shortest valid JSON possible.
-If you output anything other than a single JSON object, you fail.
+Keep strings short (<= 60 chars). Do not provide reasoning.
 """
 
+def request_preferences(payload: AIProgramRequest) -> Optional[Dict[str, Any]]:
+    preferences = payload.preferences.model_dump() if payload.preferences else None
+
+    if preferences:
+        days = preferences.get("days_of_week") or None
+        if isinstance(days, list) and len(days) > 0:
+            preferences["sessions_per_week"] = len(days)
+
+    return preferences
+
+
 def build_user_prompt(text: str, preferences: Optional[Dict[str, Any]]) -> str:
     pref_block = json.dumps(preferences, ensure_ascii=False) if preferences else "null"
     return f"""User request:
 {text}
 
 Preferences (may be null):
-{pref_block}
-
-Reminder: Use reps as a string for reps OR time. Example reps values: "8-12", "45s", "1 min on / 30s off".
-
-Return ONLY valid JSON for ProgramResponse.
-No markdown, no comments, no extra keys."""
+{pref_block}"""
 
 
 def extract_response_text(resp) -> str:
@@ -92,95 +117,210 @@ def extract_response_text(resp) -> str:
 
 def parse_program_response(text: str) -> ProgramResponse:
     data = json.loads(text)
+    if isinstance(data, dict) and set(data) == {RESPONSE_KEY}:
+        data = data[RESPONSE_KEY]
     return TypeAdapter(ProgramResponse).validate_python(data)
 
 
-def _call_llm(system: str, user: str, max_output_tokens: int) -> Any:
-    return client.responses.create(
-        model="gpt-5-mini",
-        input=[
+def parse_or_repair(text: str) -> ProgramResponse:
+    try:
+        return parse_program_response(text)
+    except (json.JSONDecodeError, ValidationError):
+        # Mechanical mistakes are fixed locally; anything else goes on to the LLM repair call.
+        repaired = repair_program_json(text)
+        if repaired is None:
+            raise
+        return repaired
+
+
+def _llm_request(system: str, user: str, max_output_tokens: int) -> Dict[str, Any]:
+    return {
+        "model": AI_MODEL,
+        "input": [
             {"role": "system", "content": system},
             {"role": "user", "content": user},
         ],
-        reasoning={"effort": "low"},
-        max_output_tokens=max_output_tokens,
-    )
+        "reasoning": {"effort": "low"},
+        "max_output_tokens": max_output_tokens,
+        "text": PROGRAM_TEXT_FORMAT,
+    }
+
+
+async def _call_llm(system: str, user: str, max_output_tokens: int) -> Any:
+    async with _llm_slots:
+        return await client.responses.create(**_llm_request(system, user, max_output_tokens))
 
 REPAIR_SYSTEM = """You fix JSON to match a strict schema.
-Return ONLY a JSON object. No markdown. No commentary.
+Your output is constrained to the ProgramResponse JSON schema.
 
 Rules:
 - Keep the same meaning.
-- Remove extra keys.
 - Rename wrong keys to the correct ones.
 - Ensure required fields exist with reasonable values.
-- Output must validate against ProgramResponse schema.
 """
 
-def generate_program(text: str, preferences: Optional[Dict[str, Any]] = None, retries: int = 2) -> ProgramResponse:
+async def generate_program(
+    text: str,
+    preferences: Optional[Dict[str, Any]] = None,
+    retries: int = 2,
+    use_cache: bool = True,
+    user_id: Optional[str] = None,
+) -> ProgramResponse:
+    rejected = precheck(text, preferences)
+    if rejected is not None:
+        return rejected
+
+    key = cache_key(text, preferences)
+
+    if use_cache:
+        cached = await program_cache.get(key)
+        if cached is not None:
+            return cached
+    else:
+        program_cache.stats["bypassed"] += 1
+
     prompt = build_user_prompt(text=text, preferences=preferences)
+    flight_key = hashlib.sha256(
+        build_user_prompt(normalize_text(text), canonical_preferences(preferences)).encode("utf-8")
+    ).hexdigest()
 
-    last_exception = None
+    async def run() -> ProgramResponse:
+        result = await _generate(prompt, retries=retries, days=expected_days(preferences), user_id=user_id)
+        await program_cache.set(key, result)
+        return result
 
-    for _ in range(retries + 1):
-        try:
-            resp = _call_llm(SYSTEM, prompt, max_output_tokens=2200)
+    return await _flights.do(flight_key, run)
 
-            if getattr(resp, "status", None) == "incomplete":
-                continue
 
-            out_text = extract_response_text(resp)
-            if not out_text:
-                continue
+class _NoOutput(Exception):
+    pass
 
-            return parse_program_response(out_text)
 
-        except (json.JSONDecodeError, ValidationError) as e:
-            last_exception = e
+class _InvalidOutput(Exception):
+    def __init__(self, text: str, error: Exception):
+        super().__init__(repr(error))
+        self.text = text
+        self.error = error
 
-            # ---- Repair attempt (1) ----
-            try:
-                # If it wasn't JSON at all, just retry normal
-                if isinstance(e, json.JSONDecodeError):
-                    continue
 
-                # ValidationError: ask model to fix its JSON
-                bad_json = out_text if "out_text" in locals() else ""
-                if not bad_json:
-                    continue
+def _observe(result: ProgramResponse, resp: Any) -> None:
+    if isinstance(result, ProgramOK):
+        output_budget.observe(len(result.days), getattr(getattr(resp, "usage", None), "output_tokens", 0) or 0)
 
-                # Keep errors short to be budget friendly
-                err_txt = str(e)
-                if len(err_txt) > 1200:
-                    err_txt = err_txt[:1200]
 
-                repair_user = f"""Fix this JSON so it validates.
+async def _attempt(prompt: str, max_output_tokens: int, days: int, user_id: Optional[str]) -> ProgramResponse:
+    started = monotonic()
+    resp = None
+    outcome = "failed"
+    try:
+        resp = await _call_llm(SYSTEM, prompt, max_output_tokens=max_output_tokens)
 
-                Validation errors:
-                {err_txt}
+        if getattr(resp, "status", None) == "incomplete":
+            outcome = "incomplete"
+            raise _NoOutput("incomplete")
 
-                Bad JSON:
-                {bad_json}
+        out_text = extract_response_text(resp)
+        if not out_text:
+            raise _NoOutput("empty")
 
-                Output ONLY the corrected JSON."""
+        try:
+            result = parse_program_response(out_text)
+            outcome = "ok"
+        except (json.JSONDecodeError, ValidationError) as e:
+            # Mechanical mistakes are fixed locally; anything else goes on to the LLM repair call.
+            result = repair_program_json(out_text)
+            if result is None:
+                raise _InvalidOutput(out_text, e) from e
+            outcome = "repaired"
+            _llm_repairs.inc(method="local")
+
+        _observe(result, resp)
+        return result
+    except asyncio.CancelledError:
+        outcome = "cancelled"
+        raise
+    finally:
+        record_call("generate", user_id, resp, max_output_tokens, started, outcome, days=days)
+
+
+async def _repair(invalid: _InvalidOutput, max_output_tokens: int, days: int, user_id: Optional[str]) -> Optional[ProgramResponse]:
+    # Keep errors short to be budget friendly
+    err_txt = str(invalid.error)
+    if len(err_txt) > 1200:
+        err_txt = err_txt[:1200]
+
+    repair_user = f"""Fix this JSON so it validates.
+
+    Validation errors:
+    {err_txt}
+
+    Bad JSON:
+    {invalid.text}
+
+    Output ONLY the corrected JSON."""
+
+    started = monotonic()
+    rep = None
+    outcome = "failed"
+    try:
+        rep = await _call_llm(REPAIR_SYSTEM, repair_user, max_output_tokens=max_output_tokens)
+
+        if getattr(rep, "status", None) == "incomplete":
+            outcome = "incomplete"
+            return None
+
+        fixed = extract_response_text(rep)
+        if not fixed:
+            return None
+
+        result = parse_or_repair(fixed)
+        outcome = "repaired"
+        _llm_repairs.inc(method="llm")
+        return result
+    except asyncio.CancelledError:
+        outcome = "cancelled"
+        raise
+    finally:
+        record_call("repair", user_id, rep, max_output_tokens, started, outcome, days=days)
+
+
+async def _generate(prompt: str, retries: int, days: int = 3, user_id: Optional[str] = None) -> ProgramResponse:
+    last_exception = None
+    max_output_tokens = await output_budget.for_days(days)
 
-                rep = _call_llm(REPAIR_SYSTEM, repair_user, max_output_tokens=1400)
+    for _ in range(retries + 1):
+        try:
+            return await _hedger.run(lambda: _attempt(prompt, max_output_tokens, days, user_id))
 
-                if getattr(rep, "status", None) == "incomplete":
-                    continue
+        except _NoOutput as e:
+            last_exception = e
+            _llm_retries.inc(reason=str(e))
+            # A truncated answer will be truncated again with the same budget.
+            if str(e) == "incomplete":
+                max_output_tokens = min(AI_OUTPUT_TOKENS_MAX, int(max_output_tokens * 1.5))
+            continue
 
-                fixed = extract_response_text(rep)
-                if not fixed:
-                    continue
+        except _InvalidOutput as invalid:
+            last_exception = invalid.error
 
-                return parse_program_response(fixed)
+            # If it wasn't JSON at all, just retry normal
+            if isinstance(invalid.error, json.JSONDecodeError):
+                _llm_retries.inc(reason="invalid_json")
+                continue
 
+            # ValidationError: ask model to fix its JSON
+            try:
+                fixed = await _repair(invalid, max_output_tokens, days, user_id)
+                if fixed is not None:
+                    return fixed
             except Exception as e2:
                 last_exception = e2
-                continue
+            _llm_retries.inc(reason="invalid_program")
+            continue
 
         except Exception as e:
             last_exception = e
+            _llm_retries.inc(reason="error")
             continue
 
     raise HTTPException(
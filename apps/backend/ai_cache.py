@@ -0,0 +1,147 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from time import monotonic
+from typing import Optional, Dict, Any
+
+from fastapi.concurrency import run_in_threadpool
+from pydantic import TypeAdapter
+from sqlalchemy.exc import IntegrityError
+
+from core.metrics import registry
+from db import SessionLocal
+from models import ProgramCacheEntry
+from schemas import ProgramResponse
+
+AI_CACHE_TTL_SECONDS = int(os.getenv("AI_CACHE_TTL_SECONDS", "86400"))
+AI_CACHE_MAX_ENTRIES = int(os.getenv("AI_CACHE_MAX_ENTRIES", "1024"))
+
+_response_adapter = TypeAdapter(ProgramResponse)
+
+
+def normalize_text(text: str) -> str:
+    return " ".join(text.lower().split())
+
+
+def canonical_preferences(preferences: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    if not preferences:
+        return None
+
+    out: Dict[str, Any] = {}
+    for key, value in preferences.items():
+        if value is None or value == "" or value == []:
+            continue
+        if isinstance(value, str):
+            value = normalize_text(value)
+        elif isinstance(value, list):
+            value = sorted(normalize_text(str(v)) for v in value)
+        out[key] = value
+
+    # Same rule as routers/ai.py: picked days win over a free-form session count.
+    days = out.get("days_of_week")
+    if days:
+        out["sessions_per_week"] = len(days)
+
+    return dict(sorted(out.items())) or None
+
+
+def cache_key(text: str, preferences: Optional[Dict[str, Any]]) -> str:
+    payload = json.dumps(
+        {"text": normalize_text(text), "preferences": canonical_preferences(preferences)},
+        sort_keys=True,
+        ensure_ascii=False,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ProgramCache:
+    def __init__(self, ttl_seconds: int, max_entries: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, tuple[float, ProgramResponse]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"memory_hits": 0, "db_hits": 0, "misses": 0, "bypassed": 0, "stores": 0}
+
+    def _get_memory(self, key: str) -> Optional[ProgramResponse]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def _put_memory(self, key: str, value: ProgramResponse, ttl_seconds: float) -> None:
+        if ttl_seconds <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (monotonic() + ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _load(self, key: str) -> Optional[tuple[ProgramResponse, float]]:
+        db = SessionLocal()
+        try:
+            row = db.get(ProgramCacheEntry, key)
+            if not row:
+                return None
+            age = (datetime.utcnow() - row.created_at).total_seconds()
+            if age >= self.ttl_seconds:
+                db.delete(row)
+                db.commit()
+                return None
+            return _response_adapter.validate_json(row.response_json), self.ttl_seconds - age
+        finally:
+            db.close()
+
+    def _store(self, key: str, value: ProgramResponse) -> None:
+        db = SessionLocal()
+        try:
+            cutoff = datetime.utcnow() - timedelta(seconds=self.ttl_seconds)
+            db.query(ProgramCacheEntry).filter(ProgramCacheEntry.created_at < cutoff).delete()
+            db.merge(
+                ProgramCacheEntry(
+                    key=key,
+                    response_json=value.model_dump_json(),
+                    created_at=datetime.utcnow(),
+                )
+            )
+            db.commit()
+        except IntegrityError:
+            # Another worker stored the same key first; its entry is as good as ours.
+            db.rollback()
+        finally:
+            db.close()
+
+    async def get(self, key: str) -> Optional[ProgramResponse]:
+        value = self._get_memory(key)
+        if value is not None:
+            self.stats["memory_hits"] += 1
+            return value
+
+        loaded = await run_in_threadpool(self._load, key)
+        if loaded is None:
+            self.stats["misses"] += 1
+            return None
+
+        value, remaining = loaded
+        self._put_memory(key, value, remaining)
+        self.stats["db_hits"] += 1
+        return value
+
+    async def set(self, key: str, value: ProgramResponse) -> None:
+        self._put_memory(key, value, self.ttl_seconds)
+        await run_in_threadpool(self._store, key, value)
+        self.stats["stores"] += 1
+
+
+program_cache = ProgramCache(ttl_seconds=AI_CACHE_TTL_SECONDS, max_entries=AI_CACHE_MAX_ENTRIES)
+registry.stats_counter("ai_cache_total", "Program cache lookups and stores.", program_cache.stats)
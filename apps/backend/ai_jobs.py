@@ -0,0 +1,200 @@
+import asyncio
+import json
+import logging
+import os
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session
+
+from ai import generate_program, request_preferences
+from core.metrics import registry
+from db import SessionLocal, async_session
+from models import AIJob
+from schemas import AIJobRequest, ProgramOK, ProgramResponse
+from workout_store import create_workout
+
+logger = logging.getLogger(__name__)
+
+# Set AI_JOB_WORKERS=0 on web processes to run generation only in dedicated `python worker.py` processes.
+AI_JOB_WORKERS = int(os.getenv("AI_JOB_WORKERS", "2"))
+AI_JOB_POLL_SECONDS = float(os.getenv("AI_JOB_POLL_SECONDS", "1.0"))
+AI_JOB_MAX_QUEUED = int(os.getenv("AI_JOB_MAX_QUEUED", "1000"))
+# A job left "running" longer than this is assumed orphaned by a dead worker and is queued again.
+AI_JOB_STALE_SECONDS = int(os.getenv("AI_JOB_STALE_SECONDS", "600"))
+AI_JOB_MAX_ATTEMPTS = 3
+
+_ABANDONED_ERROR = json.dumps({"code": "AI_FAILED", "message": "AI could not finish this generation. Try again."})
+
+
+def queued_count(db: Session) -> int:
+    return db.query(AIJob).filter(AIJob.status == "queued").count()
+
+
+def _claim() -> Optional[AIJob]:
+    db = SessionLocal()
+    try:
+        now = datetime.utcnow()
+        orphaned = db.query(AIJob).filter(
+            AIJob.status == "running",
+            AIJob.started_at < now - timedelta(seconds=AI_JOB_STALE_SECONDS),
+        )
+        orphaned.filter(AIJob.attempts < AI_JOB_MAX_ATTEMPTS).update(
+            {"status": "queued"}, synchronize_session=False
+        )
+        # Out of attempts: finished as failed so pollers stop waiting on a job nobody will run.
+        orphaned.filter(AIJob.attempts >= AI_JOB_MAX_ATTEMPTS).update(
+            {"status": "failed", "error_json": _ABANDONED_ERROR, "finished_at": now}, synchronize_session=False
+        )
+        db.commit()
+
+        candidates = (
+            db.query(AIJob.id)
+            .filter(AIJob.status == "queued")
+            .order_by(AIJob.created_at)
+            .limit(5)
+            .all()
+        )
+        for (job_id,) in candidates:
+            # Conditional update so two workers can never claim the same job.
+            claimed = (
+                db.query(AIJob)
+                .filter(AIJob.id == job_id, AIJob.status == "queued")
+                .update(
+                    {"status": "running", "started_at": datetime.utcnow(), "attempts": AIJob.attempts + 1},
+                    synchronize_session=False,
+                )
+            )
+            db.commit()
+            if claimed:
+                job = db.get(AIJob, job_id)
+                db.expunge(job)
+                return job
+        return None
+    finally:
+        db.close()
+
+
+def _fail(job_id: str) -> None:
+    db = SessionLocal()
+    try:
+        db.query(AIJob).filter(AIJob.id == job_id, AIJob.status == "running").update(
+            {"status": "failed", "error_json": _ABANDONED_ERROR, "finished_at": datetime.utcnow()},
+            synchronize_session=False,
+        )
+        db.commit()
+    finally:
+        db.close()
+
+
+async def _finish(
+    job: AIJob,
+    payload: AIJobRequest,
+    result: Optional[ProgramResponse],
+    error: Optional[dict],
+) -> None:
+    async with async_session() as db:
+        row = await db.get(AIJob, job.id)
+        if result is not None:
+            row.status = "done"
+            row.result_json = result.model_dump_json()
+            if job.auto_save and isinstance(result, ProgramOK):
+                workout = await create_workout(
+                    db,
+                    user_id=job.user_id,
+                    title=job.title or "My program",
+                    input_text=payload.text,
+                    preferences=payload.preferences.model_dump() if payload.preferences else None,
+                    program=result,
+                )
+                await db.flush()
+                row.workout_id = workout.id
+        else:
+            row.status = "failed"
+            row.error_json = json.dumps(error)
+        row.finished_at = datetime.utcnow()
+        await db.commit()
+
+
+async def _run(job: AIJob) -> None:
+    payload = AIJobRequest.model_validate_json(job.request_json)
+    preferences = request_preferences(payload)
+
+    result = None
+    error = None
+    try:
+        result = await generate_program(
+            payload.text,
+            preferences=preferences,
+            use_cache=not payload.fresh,
+            user_id=job.user_id,
+        )
+    except HTTPException as e:
+        error = e.detail if isinstance(e.detail, dict) else {"message": str(e.detail)}
+    except Exception as e:
+        error = {"code": "AI_FAILED", "message": "AI could not generate a valid JSON program. Try again."}
+        if os.getenv("ENV") == "dev":
+            error["debug"] = {"last_exception": repr(e)}
+
+    await _finish(job, payload, result, error)
+
+
+class JobWorkerPool:
+    def __init__(self, workers: int, poll_seconds: float):
+        self.workers = workers
+        self.poll_seconds = poll_seconds
+        self._tasks: List[asyncio.Task] = []
+        self._wake: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.stats = {"claimed": 0, "done": 0, "errors": 0}
+
+    def notify(self) -> None:
+        # Safe to call from threadpool handlers; other processes pick jobs up on their next poll.
+        if self._loop is not None and self._wake is not None:
+            self._loop.call_soon_threadsafe(self._wake.set)
+
+    async def _loop_forever(self) -> None:
+        while True:
+            job = None
+            try:
+                job = await run_in_threadpool(_claim)
+                if job is None:
+                    self._wake.clear()
+                    try:
+                        await asyncio.wait_for(self._wake.wait(), timeout=self.poll_seconds)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+
+                self.stats["claimed"] += 1
+                await _run(job)
+                self.stats["done"] += 1
+            except Exception:
+                # A locked database or a failed commit must not kill the worker; back off and keep polling.
+                self.stats["errors"] += 1
+                logger.exception("AI job worker failed%s", f" on job {job.id}" if job is not None else "")
+                if job is not None:
+                    try:
+                        await run_in_threadpool(_fail, job.id)
+                    except Exception:
+                        logger.exception("Could not mark AI job %s failed; the stale sweep will retry it", job.id)
+                await asyncio.sleep(self.poll_seconds)
+
+    async def start(self) -> None:
+        if self.workers <= 0 or self._tasks:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._loop_forever()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+
+job_pool = JobWorkerPool(workers=AI_JOB_WORKERS, poll_seconds=AI_JOB_POLL_SECONDS)
+registry.stats_counter("ai_jobs_total", "Background generation jobs claimed and finished.", job_pool.stats)
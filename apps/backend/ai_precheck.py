@@ -0,0 +1,131 @@
+import os
+import re
+from collections import Counter
+from typing import Optional, Dict, Any, Tuple
+
+from schemas import ProgramRejected
+
+# Rejections below this confidence are left to the model; set above 1 to disable the precheck.
+AI_PRECHECK_THRESHOLD = float(os.getenv("AI_PRECHECK_THRESHOLD", "0.8"))
+
+precheck_counts: Counter = Counter()
+
+FITNESS_TERMS = {
+    "workout": 2.0, "workouts": 2.0, "exercise": 2.0, "exercises": 2.0, "training": 2.0, "train": 1.5,
+    "gym": 2.0, "fitness": 2.0, "fit": 1.0, "strength": 2.0, "cardio": 2.0, "hiit": 2.0, "muscle": 2.0,
+    "muscles": 2.0, "run": 1.5, "running": 1.5, "jog": 1.5, "jogging": 1.5, "marathon": 2.0, "5k": 2.0,
+    "10k": 2.0, "swim": 1.0, "swimming": 1.0, "cycling": 1.0, "bike": 1.0, "yoga": 2.0, "pilates": 2.0,
+    "stretch": 1.5, "stretching": 1.5, "mobility": 1.5, "flexibility": 1.5, "endurance": 2.0,
+    "squat": 2.0, "squats": 2.0, "deadlift": 2.0, "bench": 1.0, "push": 1.0, "pull": 1.0,
+    "pushups": 2.0, "pullups": 2.0, "plank": 2.0, "abs": 2.0, "core": 1.0, "legs": 1.5, "leg": 1.0,
+    "arms": 1.5, "chest": 1.5, "back": 0.5, "glutes": 2.0, "shoulders": 1.5, "body": 1.0,
+    "fullbody": 2.0, "upper": 1.0, "lower": 0.5, "dumbbell": 2.0, "dumbbells": 2.0, "kettlebell": 2.0,
+    "kettlebells": 2.0, "barbell": 2.0, "bodyweight": 2.0, "reps": 2.0, "sets": 1.0, "weight": 1.0,
+    "weights": 1.5, "lose": 0.5, "fat": 1.0, "bulk": 1.5, "tone": 1.0, "toning": 1.5, "athletic": 1.5,
+    "beginner": 1.0, "intermediate": 1.0, "advanced": 0.5, "sessions": 1.0, "session": 1.0,
+    "calisthenics": 2.0, "crossfit": 2.0, "conditioning": 2.0, "sprint": 1.5, "sprints": 1.5,
+    "walking": 1.0, "hypertrophy": 2.0, "powerlifting": 2.0, "rehab": 1.0, "knee": 0.5, "posture": 1.0,
+    "entrainement": 2.0, "musculation": 2.0, "sport": 1.5, "seance": 1.0, "seances": 1.0,
+}
+
+OFF_TOPIC_TERMS = {
+    "code": 2.0, "coding": 2.0, "python": 2.0, "javascript": 2.0, "java": 1.5, "typescript": 2.0,
+    "sql": 2.0, "function": 1.0, "bug": 1.5, "debug": 2.0, "compile": 2.0, "api": 1.0, "regex": 2.0,
+    "html": 2.0, "css": 2.0, "react": 1.5, "essay": 2.0, "poem": 2.0, "story": 1.5, "novel": 1.5,
+    "lyrics": 2.0, "song": 1.5, "translate": 2.0, "translation": 2.0, "math": 2.0, "equation": 2.0,
+    "integral": 2.0, "derivative": 1.5, "homework": 1.5, "politics": 2.0, "election": 2.0,
+    "president": 1.5, "war": 1.0, "stock": 1.5, "stocks": 1.5, "crypto": 2.0, "bitcoin": 2.0,
+    "invest": 1.5, "weather": 2.0, "movie": 2.0, "movies": 2.0, "recipe": 1.0, "cake": 1.0,
+    "email": 1.0, "letter": 1.0, "resume": 1.5, "cv": 1.5, "capital": 1.0, "country": 1.0,
+    "history": 1.5, "joke": 1.5, "jokes": 1.5, "game": 1.0, "chess": 1.5, "password": 1.5,
+    "hack": 2.0, "linux": 2.0, "excel": 2.0, "summarize": 2.0, "summary": 1.5, "ignore": 1.0,
+    "instructions": 1.0, "prompt": 1.5,
+}
+
+# Body parts and pain words. They do not make a request fitness on their own, but a request that mentions them
+# ("I code all day and my neck hurts") is about the body however many off-topic words surround it.
+BODY_TERMS = {
+    "neck": 1.0, "shoulder": 1.0, "wrist": 1.0, "wrists": 1.0, "hip": 1.0, "hips": 1.0, "spine": 1.0,
+    "ankle": 1.0, "ankles": 1.0, "elbow": 1.0, "joints": 1.0, "pain": 1.5, "hurt": 1.5, "hurts": 1.5,
+    "ache": 1.5, "aches": 1.5, "sore": 1.5, "stiff": 1.5, "injury": 1.5, "injured": 1.5,
+}
+
+# Words that carry no usable detail on their own ("hi", "make me a plan", "help please").
+FILLER_TERMS = {
+    "hi", "hello", "hey", "yo", "help", "please", "pls", "plan", "program", "programme", "make", "me",
+    "a", "an", "the", "i", "want", "need", "something", "anything", "some", "give", "create", "can",
+    "you", "my", "for", "to", "do", "ok", "okay", "thanks", "thank", "test", "new", "good", "best",
+    "what", "should", "it", "this", "that", "is", "be", "get", "start", "go", "lets", "let", "us",
+}
+
+_TOKEN_RE = re.compile(r"\w+")
+
+# Smoothing keeps a single weak off-topic word from clearing the threshold on its own.
+_SMOOTHING = 0.5
+
+# Distinct off-topic words needed for a confident rejection. One alone is too ambiguous
+# ("I write code all day, need a routine", "ready for ski season, the weather is cold").
+_MIN_OFF_TOPIC_SIGNALS = 2
+
+
+def _tokens(text: str) -> list:
+    return _TOKEN_RE.findall(text.lower().replace("-", "").replace("'", ""))
+
+
+def _has_preferences(preferences: Optional[Dict[str, Any]]) -> bool:
+    if not preferences:
+        return False
+    return any(v not in (None, "", []) for v in preferences.values())
+
+
+def classify(text: str, preferences: Optional[Dict[str, Any]] = None) -> Tuple[str, float]:
+    tokens = _tokens(text)
+    fitness = sum(FITNESS_TERMS.get(t, 0.0) for t in tokens)
+    off_topic = sum(OFF_TOPIC_TERMS.get(t, 0.0) for t in tokens)
+    body = sum(BODY_TERMS.get(t, 0.0) for t in tokens)
+
+    if _has_preferences(preferences) or fitness >= 2.0:
+        return "ok", 1.0
+
+    if off_topic > 0:
+        confidence = off_topic / (off_topic + fitness + body + _SMOOTHING)
+        if len({t for t in tokens if t in OFF_TOPIC_TERMS}) < _MIN_OFF_TOPIC_SIGNALS:
+            confidence /= 2
+        return "NOT_FITNESS", confidence
+
+    # Only words we know to be empty make a request vague; unknown words (other languages included) go to the model.
+    if tokens and all(t in FILLER_TERMS for t in tokens):
+        return "TOO_VAGUE", 0.95
+
+    return "ok", 0.5
+
+
+def precheck(text: str, preferences: Optional[Dict[str, Any]] = None) -> Optional[ProgramRejected]:
+    label, confidence = classify(text, preferences)
+
+    if label == "ok" or confidence < AI_PRECHECK_THRESHOLD:
+        precheck_counts["passed"] += 1
+        return None
+
+    precheck_counts[label] += 1
+    if label == "NOT_FITNESS":
+        return ProgramRejected(
+            status="rejected",
+            code="NOT_FITNESS",
+            message="This assistant only builds workout programs.",
+            hints=[
+                "Describe a fitness goal, e.g. \"lose fat with 3 home workouts a week\".",
+                "Mention your level and the equipment you have.",
+            ],
+        )
+
+    return ProgramRejected(
+        status="rejected",
+        code="TOO_VAGUE",
+        message="Tell us a bit more about the program you want.",
+        hints=[
+            "Add your goal, e.g. \"build strength\" or \"run a 5k\".",
+            "Say how many days per week you can train.",
+            "Fill in the preferences form (level, duration, equipment).",
+        ],
+    )
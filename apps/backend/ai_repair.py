@@ -0,0 +1,227 @@
+import json
+import re
+from collections import Counter
+from typing import Any, Optional, Dict, List
+
+from pydantic import ValidationError
+
+from schemas import ProgramOK, ProgramRejected, ProgramResponse
+
+MAX_PASSES = 5
+
+# How often each rule fired, plus "ok"/"failed" outcomes of whole repair attempts.
+rule_counts: Counter = Counter()
+outcome_counts: Counter = Counter()
+
+KEY_ALIASES: Dict[str, List[str]] = {
+    "reps": ["reps_or_time", "time", "duration", "repetitions", "reps_or_duration"],
+    "rest_seconds": ["rest", "rest_sec", "rest_s", "rest_time", "rest_secs"],
+    "name": ["exercise", "exercise_name", "title"],
+    "estimated_calories": ["calories", "kcal", "estimated_kcal", "calories_burned"],
+    "duration_minutes": ["duration", "minutes", "duration_min", "session_minutes"],
+    "warmup": ["warm_up", "warm-up"],
+    "cooldown": ["cool_down", "cool-down"],
+    "day": ["day_number", "day_index"],
+    "exercises": ["workout", "exercise_list"],
+    "equipment": ["equipment_needed", "gear"],
+}
+
+LIST_FIELDS = {"equipment", "warmup", "cooldown", "hints"}
+
+LITERAL_SYNONYMS = {
+    "moderate": "medium",
+    "med": "medium",
+    "mid": "medium",
+    "easy": "low",
+    "light": "low",
+    "hard": "high",
+    "intense": "high",
+    "vigorous": "high",
+}
+
+_FENCE_RE = re.compile(r"^\s*```[a-zA-Z]*\s*|\s*```\s*$")
+_INT_RE = re.compile(r"-?\d+")
+
+
+def _strip_trailing_commas(text: str) -> str:
+    out = []
+    in_string = False
+    escape = False
+    for i, ch in enumerate(text):
+        if in_string:
+            if escape:
+                escape = False
+            elif ch == "\\":
+                escape = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch == ",":
+            rest = text[i + 1:].lstrip()
+            if rest[:1] in ("}", "]"):
+                rule_counts["trailing_comma"] += 1
+                continue
+        out.append(ch)
+    return "".join(out)
+
+
+def _clean_text(text: str) -> str:
+    cleaned = _FENCE_RE.sub("", text)
+    if cleaned != text:
+        rule_counts["markdown_fence"] += 1
+
+    start, end = cleaned.find("{"), cleaned.rfind("}")
+    if start > 0 or (end != -1 and end < len(cleaned) - 1):
+        rule_counts["surrounding_text"] += 1
+    if start != -1 and end > start:
+        cleaned = cleaned[start:end + 1]
+
+    return _strip_trailing_commas(cleaned)
+
+
+def _container(data: Any, path) -> Any:
+    for part in path:
+        data = data[part]
+    return data
+
+
+def _fix_error(data: Any, err: Dict[str, Any]) -> bool:
+    loc = err["loc"]
+    if not loc:
+        return False
+    try:
+        parent = _container(data, loc[:-1])
+    except (KeyError, IndexError, TypeError):
+        return False
+
+    field = loc[-1]
+    kind = err["type"]
+
+    if kind == "missing" and isinstance(parent, dict):
+        for alias in KEY_ALIASES.get(field, []):
+            if alias in parent:
+                parent[field] = parent.pop(alias)
+                rule_counts["rename_key"] += 1
+                return True
+        if field in LIST_FIELDS:
+            parent[field] = []
+            rule_counts["default_list"] += 1
+            return True
+        return False
+
+    try:
+        value = parent[field]
+    except (KeyError, IndexError, TypeError):
+        return False
+
+    if kind == "string_type":
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            parent[field] = str(value)
+            rule_counts["number_to_string"] += 1
+            return True
+        if isinstance(value, list) and all(isinstance(v, str) for v in value):
+            parent[field] = ", ".join(value)
+            rule_counts["list_to_string"] += 1
+            return True
+        return False
+
+    if kind == "list_type":
+        if isinstance(value, str):
+            parent[field] = [v.strip() for v in value.split(",") if v.strip()]
+            rule_counts["string_to_list"] += 1
+            return True
+        if value is None:
+            parent[field] = []
+            rule_counts["default_list"] += 1
+            return True
+        return False
+
+    if kind == "int_parsing" and isinstance(value, str):
+        match = _INT_RE.search(value)
+        if match:
+            parent[field] = int(match.group())
+            rule_counts["extract_int"] += 1
+            return True
+        return False
+
+    if kind == "int_from_float" and isinstance(value, float):
+        parent[field] = round(value)
+        rule_counts["round_number"] += 1
+        return True
+
+    if kind in ("greater_than_equal", "greater_than", "less_than_equal", "less_than"):
+        ctx = err.get("ctx") or {}
+        bound = ctx.get("ge", ctx.get("gt", ctx.get("le", ctx.get("lt"))))
+        if isinstance(bound, (int, float)):
+            parent[field] = bound
+            rule_counts["clamp_range"] += 1
+            return True
+        return False
+
+    if kind == "literal_error" and isinstance(value, str):
+        normalized = value.strip().lower()
+        normalized = LITERAL_SYNONYMS.get(normalized, normalized)
+        if normalized != value:
+            parent[field] = normalized
+            rule_counts["normalize_literal"] += 1
+            return True
+        return False
+
+    return False
+
+
+def _normalize_envelope(data: Any) -> Any:
+    if isinstance(data, list) and all(isinstance(d, dict) for d in data):
+        rule_counts["wrap_days"] += 1
+        data = {"status": "ok", "days": data}
+
+    if isinstance(data, dict) and "status" not in data and len(data) == 1:
+        inner = next(iter(data.values()))
+        if isinstance(inner, dict):
+            rule_counts["unwrap_envelope"] += 1
+            data = inner
+
+    if isinstance(data, dict) and "status" not in data and "days" in data:
+        rule_counts["default_status"] += 1
+        data["status"] = "ok"
+
+    if isinstance(data, dict) and isinstance(data.get("status"), str):
+        status = data["status"].strip().lower()
+        if status != data["status"]:
+            rule_counts["normalize_literal"] += 1
+            data["status"] = status
+
+    return data
+
+
+def repair_program_json(text: str) -> Optional[ProgramResponse]:
+    try:
+        data = _normalize_envelope(json.loads(_clean_text(text)))
+    except json.JSONDecodeError:
+        outcome_counts["failed"] += 1
+        return None
+
+    if not isinstance(data, dict):
+        outcome_counts["failed"] += 1
+        return None
+
+    # Validate against the concrete model so error locations are not prefixed by union tags.
+    model = ProgramRejected if data.get("status") == "rejected" else ProgramOK
+
+    for _ in range(MAX_PASSES):
+        try:
+            result = model.model_validate(data)
+        except ValidationError as e:
+            changed = False
+            for err in e.errors():
+                changed = _fix_error(data, err) or changed
+            if not changed:
+                break
+            continue
+
+        outcome_counts["ok"] += 1
+        return result
+
+    outcome_counts["failed"] += 1
+    return None
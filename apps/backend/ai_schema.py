@@ -0,0 +1,58 @@
+from typing import Any, Dict
+
+from pydantic import TypeAdapter
+
+from schemas import ProgramResponse
+
+# Structured outputs need an object at the root, so the ProgramOK | ProgramRejected union is nested here.
+RESPONSE_KEY = "response"
+
+_DROPPED_KEYS = {"title", "default"}
+
+
+def _strict(node: Any) -> Any:
+    if isinstance(node, list):
+        return [_strict(n) for n in node]
+    if not isinstance(node, dict):
+        return node
+
+    out: Dict[str, Any] = {}
+    for key, value in node.items():
+        if key in _DROPPED_KEYS:
+            continue
+        if key == "const":
+            out["enum"] = [value]
+            continue
+        if key in ("properties", "$defs"):
+            out[key] = {name: _strict(sub) for name, sub in value.items()}
+            continue
+        out[key] = _strict(value)
+
+    if out.get("type") == "object":
+        out["additionalProperties"] = False
+        out["required"] = list(out.get("properties", {}))
+
+    return out
+
+
+def program_json_schema() -> Dict[str, Any]:
+    union = TypeAdapter(ProgramResponse).json_schema()
+    defs = union.pop("$defs", {})
+
+    return _strict(
+        {
+            "type": "object",
+            "properties": {RESPONSE_KEY: union},
+            "$defs": defs,
+        }
+    )
+
+
+PROGRAM_TEXT_FORMAT = {
+    "format": {
+        "type": "json_schema",
+        "name": "program_response",
+        "schema": program_json_schema(),
+        "strict": True,
+    }
+}
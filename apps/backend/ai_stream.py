@@ -0,0 +1,221 @@
+import asyncio
+import json
+from time import monotonic
+from typing import AsyncIterator, Optional, Dict, Any, List
+
+from fastapi import HTTPException
+from pydantic import ValidationError
+
+from ai import (
+    SYSTEM,
+    client,
+    _llm_slots,
+    _llm_request,
+    _generate,
+    _observe,
+    build_user_prompt,
+    parse_program_response,
+)
+from ai_repair import repair_program_json
+from ai_usage import expected_days, output_budget, record_call
+from ai_cache import cache_key, program_cache
+from ai_precheck import precheck
+from schemas import DayProgram, ProgramRejected, ProgramResponse
+
+
+# Incremental scanner: returns each element of the "days" array as soon as its object closes.
+class DayStreamParser:
+    def __init__(self):
+        self.text = ""
+        self._pos = 0
+        self._stack: List[str] = []
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self._last_string: Optional[str] = None
+        self._key: Optional[str] = None
+        self._days_depth: Optional[int] = None
+        self._day_start: Optional[int] = None
+
+    def feed(self, chunk: str) -> List[str]:
+        self.text += chunk
+        done: List[str] = []
+
+        while self._pos < len(self.text):
+            i = self._pos
+            ch = self.text[i]
+            self._pos += 1
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    self._last_string = self.text[self._string_start:i]
+                continue
+
+            if ch == '"':
+                self._in_string = True
+                self._string_start = i + 1
+            elif ch == ":":
+                self._key = self._last_string
+            elif ch == ",":
+                self._key = None
+            elif ch in "{[":
+                if (
+                    ch == "["
+                    and self._days_depth is None
+                    and self._key == "days"
+                    and self._stack
+                    and self._stack[-1] == "{"
+                ):
+                    self._days_depth = len(self._stack) + 1
+                elif ch == "{" and self._days_depth is not None and len(self._stack) == self._days_depth:
+                    self._day_start = i
+                self._stack.append(ch)
+                self._key = None
+            elif ch in "}]":
+                if self._stack:
+                    self._stack.pop()
+                if ch == "}" and self._day_start is not None and len(self._stack) == self._days_depth:
+                    done.append(self.text[self._day_start:i + 1])
+                    self._day_start = None
+                elif ch == "]" and self._days_depth is not None and len(self._stack) < self._days_depth:
+                    self._days_depth = None
+
+        return done
+
+
+def _sse(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def _final_events(result: ProgramResponse, sent_days: Dict[int, Dict[str, Any]]) -> List[str]:
+    events = []
+    days = {} if isinstance(result, ProgramRejected) else {d.day: d.model_dump() for d in result.days}
+    if any(days.get(n) != d for n, d in sent_days.items()):
+        # Repair or regeneration changed days the client already has: it starts over from this event.
+        events.append(_sse("reset", {}))
+        sent_days = {}
+
+    if isinstance(result, ProgramRejected):
+        events.append(_sse("rejected", {"code": result.code, "message": result.message, "hints": result.hints}))
+        return events
+
+    events.extend(_sse("day", d) for n, d in days.items() if n not in sent_days)
+    events.append(_sse("done", result.model_dump()))
+    return events
+
+
+async def _read_stream(prompt: str, max_output_tokens: int, deltas: asyncio.Queue) -> Any:
+    """Runs the streamed LLM call under a concurrency slot, handing text deltas to the SSE generator.
+
+    The slot is freed as soon as the model is done, however slowly the client reads its events.
+    """
+    final = None
+    try:
+        async with _llm_slots:
+            stream = await client.responses.create(
+                **_llm_request(SYSTEM, prompt, max_output_tokens),
+                stream=True,
+            )
+            async for event in stream:
+                if event.type == "response.output_text.delta":
+                    deltas.put_nowait(event.delta)
+                elif event.type in ("response.completed", "response.incomplete"):
+                    final = event.response
+    finally:
+        deltas.put_nowait(None)
+    return final
+
+
+async def stream_program(
+    text: str,
+    preferences: Optional[Dict[str, Any]] = None,
+    retries: int = 2,
+    use_cache: bool = True,
+    user_id: Optional[str] = None,
+) -> AsyncIterator[str]:
+    rejected = precheck(text, preferences)
+    if rejected is not None:
+        for event in _final_events(rejected, {}):
+            yield event
+        return
+
+    key = cache_key(text, preferences)
+
+    if use_cache:
+        cached = await program_cache.get(key)
+        if cached is not None:
+            for event in _final_events(cached, {}):
+                yield event
+            return
+    else:
+        program_cache.stats["bypassed"] += 1
+
+    prompt = build_user_prompt(text=text, preferences=preferences)
+    days = expected_days(preferences)
+    max_output_tokens = await output_budget.for_days(days)
+    parser = DayStreamParser()
+    sent_days: Dict[int, Dict[str, Any]] = {}
+    result: Optional[ProgramResponse] = None
+
+    started = monotonic()
+    final = None
+    outcome = "failed"
+    deltas: asyncio.Queue = asyncio.Queue()
+    reader = asyncio.create_task(_read_stream(prompt, max_output_tokens, deltas))
+    try:
+        while True:
+            delta = await deltas.get()
+            if delta is None:
+                break
+            for day_text in parser.feed(delta):
+                try:
+                    day = DayProgram.model_validate_json(day_text)
+                except ValidationError:
+                    # Left for the final validation pass / fallback below.
+                    continue
+                if day.day in sent_days:
+                    continue
+                sent_days[day.day] = day.model_dump()
+                yield _sse("day", sent_days[day.day])
+        final = await reader
+
+        if getattr(final, "status", None) == "incomplete":
+            outcome = "incomplete"
+        elif final is not None:
+            out_text = parser.text.strip()
+            try:
+                result = parse_program_response(out_text)
+                outcome = "ok"
+            except (json.JSONDecodeError, ValidationError):
+                result = repair_program_json(out_text)
+                outcome = "repaired" if result is not None else "failed"
+            if result is not None:
+                _observe(result, final)
+    except (asyncio.CancelledError, GeneratorExit):
+        outcome = "cancelled"
+        raise
+    except Exception:
+        result = None
+    finally:
+        reader.cancel()
+        record_call("stream", user_id, final, max_output_tokens, started, outcome, days=days)
+
+    if result is None:
+        # The stream did not produce a valid program; finish through the regular retry/repair path.
+        if sent_days:
+            yield _sse("reset", {})
+            sent_days = {}
+        try:
+            result = await _generate(prompt, retries=retries, days=days, user_id=user_id)
+        except HTTPException as e:
+            yield _sse("error", e.detail)
+            return
+
+    await program_cache.set(key, result)
+    for event in _final_events(result, sent_days):
+        yield event
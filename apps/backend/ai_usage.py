@@ -0,0 +1,141 @@
+import asyncio
+import logging
+import os
+import threading
+from time import monotonic
+from typing import Any, Optional, Dict
+
+from core.metrics import registry
+from db import SessionLocal
+from models import AIUsage
+
+logger = logging.getLogger(__name__)
+
+AI_MODEL = "gpt-5-mini"
+
+# USD per million tokens, used for the admin cost report.
+AI_PRICE_INPUT_PER_MTOK = float(os.getenv("AI_PRICE_INPUT_PER_MTOK", "0.25"))
+AI_PRICE_OUTPUT_PER_MTOK = float(os.getenv("AI_PRICE_OUTPUT_PER_MTOK", "2.0"))
+
+# Output budget = overhead + expected days * observed tokens per day * margin, clamped.
+AI_OUTPUT_TOKENS_MIN = int(os.getenv("AI_OUTPUT_TOKENS_MIN", "800"))
+AI_OUTPUT_TOKENS_MAX = int(os.getenv("AI_OUTPUT_TOKENS_MAX", "4000"))
+_BUDGET_OVERHEAD = 300
+_BUDGET_MARGIN = 1.3
+_DEFAULT_TOKENS_PER_DAY = 280.0
+_EMA_WEIGHT = 0.1
+_SEED_ROWS = 200
+
+_LLM_BUCKETS = (0.5, 1.0, 2.5, 5.0, 10.0, 15.0, 20.0, 30.0, 45.0, 60.0, 90.0, 120.0)
+_llm_seconds = registry.histogram(
+    "llm_call_duration_seconds", "Upstream LLM call latency.", ["kind", "outcome"], _LLM_BUCKETS
+)
+_llm_tokens = registry.counter("llm_tokens_total", "Tokens reported by the LLM API.", ["kind", "direction"])
+
+
+def expected_days(preferences: Optional[Dict[str, Any]]) -> int:
+    if preferences:
+        days = preferences.get("days_of_week")
+        if isinstance(days, list) and days:
+            return min(len(days), 7)
+        if preferences.get("sessions_per_week"):
+            return min(int(preferences["sessions_per_week"]), 7)
+    return 3
+
+
+def cost_usd(input_tokens: int, output_tokens: int) -> float:
+    return (input_tokens * AI_PRICE_INPUT_PER_MTOK + output_tokens * AI_PRICE_OUTPUT_PER_MTOK) / 1_000_000
+
+
+class OutputBudget:
+    def __init__(self):
+        self.tokens_per_day = _DEFAULT_TOKENS_PER_DAY
+        self._seeded = False
+        self._lock = threading.Lock()
+
+    def _seed(self) -> None:
+        db = SessionLocal()
+        try:
+            rows = (
+                db.query(AIUsage.output_tokens, AIUsage.days)
+                .filter(AIUsage.kind == "generate", AIUsage.outcome.in_(("ok", "repaired")), AIUsage.days > 0)
+                .order_by(AIUsage.created_at.desc())
+                .limit(_SEED_ROWS)
+                .all()
+            )
+        finally:
+            db.close()
+
+        samples = [tokens / days for tokens, days in rows if tokens]
+        with self._lock:
+            if samples and not self._seeded:
+                self.tokens_per_day = sum(samples) / len(samples)
+            self._seeded = True
+
+    async def for_days(self, days: int) -> int:
+        if not self._seeded:
+            await asyncio.get_running_loop().run_in_executor(None, self._seed)
+        budget = int(_BUDGET_OVERHEAD + days * self.tokens_per_day * _BUDGET_MARGIN)
+        return max(AI_OUTPUT_TOKENS_MIN, min(AI_OUTPUT_TOKENS_MAX, budget))
+
+    def observe(self, days: int, output_tokens: int) -> None:
+        if days <= 0 or output_tokens <= 0:
+            return
+        with self._lock:
+            self.tokens_per_day += _EMA_WEIGHT * (output_tokens / days - self.tokens_per_day)
+
+
+output_budget = OutputBudget()
+
+
+def _store(row: AIUsage) -> None:
+    db = SessionLocal()
+    try:
+        db.add(row)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def _stored(future: asyncio.Future) -> None:
+    if not future.cancelled() and future.exception() is not None:
+        logger.error("Failed to record AI usage", exc_info=future.exception())
+
+
+def record_call(
+    kind: str,
+    user_id: Optional[str],
+    resp: Any,
+    max_output_tokens: int,
+    started: float,
+    outcome: str,
+    days: int = 0,
+) -> None:
+    usage = getattr(resp, "usage", None)
+    latency = monotonic() - started
+    _llm_seconds.observe(latency, kind=kind, outcome=outcome)
+    _llm_tokens.inc(getattr(usage, "input_tokens", None) or 0, kind=kind, direction="input")
+    _llm_tokens.inc(getattr(usage, "output_tokens", None) or 0, kind=kind, direction="output")
+
+    row = AIUsage(
+        user_id=user_id,
+        kind=kind,
+        model=AI_MODEL,
+        input_tokens=getattr(usage, "input_tokens", None) or 0,
+        output_tokens=getattr(usage, "output_tokens", None) or 0,
+        max_output_tokens=max_output_tokens,
+        latency_ms=int(latency * 1000),
+        outcome=outcome,
+        days=days,
+    )
+
+    # Fire and forget: accounting must never add latency to a generation.
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        _store(row)
+    else:
+        loop.run_in_executor(None, _store, row).add_done_callback(_stored)
@@ -1,26 +1,92 @@
 import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
 from datetime import datetime, timedelta, timezone
 from jose import jwt, JWTError
-from passlib.context import CryptContext
 from fastapi import Depends, HTTPException
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
-from sqlalchemy.orm import Session
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from db import get_db
+from core.metrics import registry
+from db import get_async_db
 from models import User
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 bearer = HTTPBearer()
 
 JWT_SECRET = os.getenv("JWT_SECRET", "")
 JWT_ALGORITHM = os.getenv("JWT_ALGORITHM", "HS256")
 JWT_EXP_MIN = int(os.getenv("JWT_EXPIRATION_MINUTES", "30"))
+ADMIN_EMAILS = {e.strip().lower() for e in os.getenv("ADMIN_EMAILS", "").split(",") if e.strip()}
 
-def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
+# Verified principals are cached per token, never longer than the token itself is valid.
+AUTH_CACHE_TTL_SECONDS = int(os.getenv("AUTH_CACHE_TTL_SECONDS", "300"))
+AUTH_CACHE_MAX_ENTRIES = int(os.getenv("AUTH_CACHE_MAX_ENTRIES", "10000"))
+
+_auth_seconds = registry.histogram(
+    "auth_duration_seconds", "get_current_user time: cached principal, or JWT decode plus user lookup.", ["path"]
+)
+
+
+@dataclass(frozen=True)
+class Principal:
+    id: str
+    email: str
+
+
+class PrincipalCache:
+    def __init__(self, ttl_seconds: int, max_entries: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, tuple[float, Principal]]" = OrderedDict()
+        self._tokens_by_user: dict = {}
+        self._lock = threading.Lock()
+
+    def _drop(self, token: str) -> None:
+        _, principal = self._entries.pop(token)
+        tokens = self._tokens_by_user.get(principal.id)
+        if tokens is not None:
+            tokens.discard(token)
+            if not tokens:
+                del self._tokens_by_user[principal.id]
+
+    def get(self, token: str):
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                return None
+            if entry[0] <= time.time():
+                self._drop(token)
+                return None
+            self._entries.move_to_end(token)
+            return entry[1]
+
+    def put(self, token: str, principal: Principal, token_exp: float) -> None:
+        expires_at = min(time.time() + self.ttl_seconds, token_exp)
+        with self._lock:
+            if token in self._entries:
+                self._drop(token)
+            self._entries[token] = (expires_at, principal)
+            self._tokens_by_user.setdefault(principal.id, set()).add(token)
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+
+    def invalidate_user(self, user_id: str) -> None:
+        with self._lock:
+            for token in list(self._tokens_by_user.get(user_id, ())):
+                self._drop(token)
+
+
+principal_cache = PrincipalCache(ttl_seconds=AUTH_CACHE_TTL_SECONDS, max_entries=AUTH_CACHE_MAX_ENTRIES)
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _invalidate_cached_principals(mapper, connection, target: User) -> None:
+    principal_cache.invalidate_user(target.id)
 
-def verify_password(password: str, password_hash: str) -> bool:
-    return pwd_context.verify(password, password_hash)
 
 def create_access_token(subject: str) -> str:
     now = datetime.now(timezone.utc)
@@ -31,11 +97,17 @@ def create_access_token(subject: str) -> str:
     }
     return jwt.encode(payload, JWT_SECRET, algorithm=JWT_ALGORITHM)
 
-def get_current_user(
+async def get_current_user(
     creds: HTTPAuthorizationCredentials = Depends(bearer),
-    db: Session = Depends(get_db),
-) -> User:
+    db: AsyncSession = Depends(get_async_db),
+) -> Principal:
+    started = time.perf_counter()
     token = creds.credentials
+    principal = principal_cache.get(token)
+    if principal is not None:
+        _auth_seconds.observe(time.perf_counter() - started, path="cache")
+        return principal
+
     try:
         payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
         sub = payload.get("sub")
@@ -44,7 +116,17 @@ def get_current_user(
     except JWTError:
         raise HTTPException(status_code=401, detail="Invalid token")
 
-    user = db.query(User).filter(User.id == sub).first()
+    user = (await db.execute(select(User.id, User.email).where(User.id == sub))).first()
     if not user:
         raise HTTPException(status_code=401, detail="Invalid token")
-    return user
+
+    principal = Principal(id=user.id, email=user.email)
+    principal_cache.put(token, principal, token_exp=float(payload.get("exp") or 0))
+    _auth_seconds.observe(time.perf_counter() - started, path="token")
+    return principal
+
+
+async def get_admin_user(current_user: Principal = Depends(get_current_user)) -> Principal:
+    if current_user.email.lower() not in ADMIN_EMAILS:
+        raise HTTPException(status_code=403, detail="Forbidden")
+    return current_user
@@ -0,0 +1,114 @@
+import os
+import struct
+import threading
+from typing import Dict, Optional, Union
+
+import zstandard
+from sqlalchemy import LargeBinary, text
+from sqlalchemy.types import TypeDecorator
+
+# Stored layout: MAGIC | format (1 byte) | dictionary id (4 bytes, 0 = none) | payload.
+# A NUL byte can never start JSON text, so rows written before this format are told apart by it.
+MAGIC = b"\x00CJ"
+FORMAT_RAW = 0
+FORMAT_ZSTD = 1
+_HEADER = struct.Struct(">3sBI")
+
+JSON_ZSTD_LEVEL = int(os.getenv("JSON_ZSTD_LEVEL", "6"))
+
+_lock = threading.Lock()
+_local = threading.local()
+_dictionaries: Dict[int, zstandard.ZstdCompressionDict] = {}
+_active_id = 0
+_loaded = False
+
+
+def load_dictionaries(engine=None) -> None:
+    """(Re)load shared dictionaries; the newest one is used for new writes."""
+    global _active_id, _loaded
+    if engine is None:
+        from db import engine
+
+    with engine.connect() as conn:
+        rows = conn.execute(text("SELECT id, data FROM compression_dictionaries ORDER BY id")).all()
+
+    with _lock:
+        for dict_id, data in rows:
+            if dict_id not in _dictionaries:
+                _dictionaries[dict_id] = zstandard.ZstdCompressionDict(data)
+        _active_id = rows[-1][0] if rows else 0
+        _loaded = True
+
+
+def _ensure_loaded() -> None:
+    if not _loaded:
+        load_dictionaries()
+
+
+def _compressor(dict_id: int) -> zstandard.ZstdCompressor:
+    # zstd (de)compressors are not thread-safe; keep one per thread and dictionary.
+    cache = _local.__dict__.setdefault("compressors", {})
+    if dict_id not in cache:
+        cache[dict_id] = zstandard.ZstdCompressor(level=JSON_ZSTD_LEVEL, dict_data=_dictionaries.get(dict_id))
+    return cache[dict_id]
+
+
+def _decompressor(dict_id: int) -> zstandard.ZstdDecompressor:
+    cache = _local.__dict__.setdefault("decompressors", {})
+    if dict_id not in cache:
+        if dict_id and dict_id not in _dictionaries:
+            load_dictionaries()
+        cache[dict_id] = zstandard.ZstdDecompressor(dict_data=_dictionaries.get(dict_id))
+    return cache[dict_id]
+
+
+def encode(value: str) -> bytes:
+    _ensure_loaded()
+    raw = value.encode("utf-8")
+    dict_id = _active_id
+    packed = _compressor(dict_id).compress(raw)
+    if len(packed) >= len(raw):
+        return _HEADER.pack(MAGIC, FORMAT_RAW, 0) + raw
+    return _HEADER.pack(MAGIC, FORMAT_ZSTD, dict_id) + packed
+
+
+def decode(value: Union[bytes, str]) -> str:
+    if isinstance(value, str):
+        return value
+    value = bytes(value)
+    if not value.startswith(MAGIC):
+        return value.decode("utf-8")
+
+    _, fmt, dict_id = _HEADER.unpack_from(value)
+    payload = value[_HEADER.size:]
+    if fmt == FORMAT_RAW:
+        return payload.decode("utf-8")
+    if fmt == FORMAT_ZSTD:
+        return _decompressor(dict_id).decompress(payload).decode("utf-8")
+    raise ValueError(f"Unknown compact JSON format {fmt}")
+
+
+def is_compact(value: Union[bytes, str, None]) -> bool:
+    return isinstance(value, (bytes, memoryview)) and bytes(value[:len(MAGIC)]) == MAGIC
+
+
+def dictionary_id(value: bytes) -> int:
+    return _HEADER.unpack_from(bytes(value))[2]
+
+
+def active_dictionary_id() -> int:
+    _ensure_loaded()
+    return _active_id
+
+
+class CompactJSON(TypeDecorator):
+    """JSON text column stored zstd-compressed; reads and writes plain str, legacy text rows pass through."""
+
+    impl = LargeBinary
+    cache_ok = True
+
+    def process_bind_param(self, value: Optional[str], dialect) -> Optional[bytes]:
+        return None if value is None else encode(value)
+
+    def process_result_value(self, value: Union[bytes, str, None], dialect) -> Optional[str]:
+        return None if value is None else decode(value)
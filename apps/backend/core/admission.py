@@ -0,0 +1,31 @@
+import math
+
+from fastapi import HTTPException
+
+
+class AdmissionQueue:
+    # Bounded in-process queue: at most `capacity` requests may be running or waiting at once.
+    def __init__(self, capacity: int, retry_after_seconds: int):
+        self.capacity = capacity
+        self.retry_after_seconds = retry_after_seconds
+        self.active = 0
+        self.stats = {"admitted": 0, "shed": 0}
+
+    # Checking and claiming a place is one synchronous step, so callers on the event loop cannot overshoot capacity.
+    def try_enter(self) -> None:
+        if self.active >= self.capacity:
+            self.stats["shed"] += 1
+            raise HTTPException(
+                status_code=503,
+                detail={"code": "AI_BUSY", "message": "The AI generator is at capacity. Try again shortly."},
+                headers={"Retry-After": str(self.retry_after_seconds)},
+            )
+        self.active += 1
+        self.stats["admitted"] += 1
+
+    def release(self) -> None:
+        self.active -= 1
+
+
+def retry_after_header(seconds: float) -> dict:
+    return {"Retry-After": str(max(1, math.ceil(seconds)))}
@@ -1,16 +1,40 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
+from ai_jobs import job_pool
 from core.errors import add_exception_handlers
+from core.metrics import MetricsMiddleware
+from core.profiler import profiler
+from exercise_catalog import start_catalog, stop_catalog
+import passwords
 from db import Base, engine
+from migrations import run_migrations
+from pagination import NEXT_CURSOR_HEADER
 from routers.auth import router as auth_router
 from routers.workouts import router as workouts_router
 from routers.exercise_lists import router as exercise_lists_router
+from routers.search import router as search_router
+from routers.exercises import router as exercises_router
+from routers.metrics import router as metrics_router
 from routers.ai import router as ai_router
+from routers.admin import router as admin_router
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await start_catalog()
+    await job_pool.start()
+    yield
+    await job_pool.stop()
+    await stop_catalog()
+    passwords.shutdown()
+    profiler.stop()
 
 
 def create_app() -> FastAPI:
-    app = FastAPI()
+    app = FastAPI(lifespan=lifespan)
 
     add_exception_handlers(app)
 
@@ -20,13 +44,21 @@ def create_app() -> FastAPI:
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        expose_headers=[NEXT_CURSOR_HEADER],
     )
+    # Added last so it is outermost and times the whole stack, CORS included.
+    app.add_middleware(MetricsMiddleware)
 
     Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
 
     app.include_router(auth_router)
     app.include_router(workouts_router)
     app.include_router(exercise_lists_router)
+    app.include_router(search_router)
+    app.include_router(exercises_router)
+    app.include_router(metrics_router)
     app.include_router(ai_router)
+    app.include_router(admin_router)
 
     return app
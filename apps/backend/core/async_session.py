@@ -0,0 +1,97 @@
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Optional
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session
+
+
+class _StreamedResult:
+    """AsyncResult-style partitions over a sync Result, each fetch on the threadpool."""
+
+    def __init__(self, result):
+        self._result = result
+
+    async def partitions(self, size: Optional[int] = None) -> AsyncIterator[list]:
+        partitions = self._result.partitions(size)
+        while (rows := await run_in_threadpool(next, partitions, None)) is not None:
+            yield rows
+
+    async def close(self) -> None:
+        await run_in_threadpool(self._result.close)
+
+
+class SyncSessionAdapter:
+    """The subset of the AsyncSession API the app uses, served by a sync Session on the threadpool.
+
+    Lets every caller be written against one async interface while DB_ASYNC=0 keeps the sync driver.
+    """
+
+    def __init__(self, session: Session):
+        self.sync_session = session
+
+    @property
+    def info(self) -> dict:
+        return self.sync_session.info
+
+    def add(self, instance: Any) -> None:
+        self.sync_session.add(instance)
+
+    def add_all(self, instances) -> None:
+        self.sync_session.add_all(instances)
+
+    def expunge_all(self) -> None:
+        self.sync_session.expunge_all()
+
+    def _execute_buffered(self, statement, *args, **kwargs):
+        result = self.sync_session.execute(statement, *args, **kwargs)
+        # Like AsyncSession, hand back fully fetched rows so iterating them never touches the DB again.
+        return result.freeze()() if getattr(result, "returns_rows", True) else result
+
+    async def execute(self, statement, *args, **kwargs):
+        return await run_in_threadpool(self._execute_buffered, statement, *args, **kwargs)
+
+    async def stream(self, statement, *args, **kwargs) -> _StreamedResult:
+        return _StreamedResult(await run_in_threadpool(self.sync_session.execute, statement, *args, **kwargs))
+
+    async def scalar(self, statement, *args, **kwargs):
+        return await run_in_threadpool(self.sync_session.scalar, statement, *args, **kwargs)
+
+    async def scalars(self, statement, *args, **kwargs):
+        return (await self.execute(statement, *args, **kwargs)).scalars()
+
+    async def get(self, entity, ident, **kwargs):
+        return await run_in_threadpool(self.sync_session.get, entity, ident, **kwargs)
+
+    async def delete(self, instance: Any) -> None:
+        await run_in_threadpool(self.sync_session.delete, instance)
+
+    async def flush(self) -> None:
+        await run_in_threadpool(self.sync_session.flush)
+
+    async def refresh(self, instance: Any) -> None:
+        await run_in_threadpool(self.sync_session.refresh, instance)
+
+    async def commit(self) -> None:
+        await run_in_threadpool(self.sync_session.commit)
+
+    async def rollback(self) -> None:
+        await run_in_threadpool(self.sync_session.rollback)
+
+    async def close(self) -> None:
+        await run_in_threadpool(self.sync_session.close)
+
+    @asynccontextmanager
+    async def begin_nested(self) -> AsyncIterator[None]:
+        transaction = await run_in_threadpool(self.sync_session.begin_nested)
+        try:
+            yield
+        except BaseException:
+            await run_in_threadpool(transaction.rollback)
+            raise
+        await run_in_threadpool(transaction.commit)
+
+    async def __aenter__(self) -> "SyncSessionAdapter":
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.close()
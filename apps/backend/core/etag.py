@@ -0,0 +1,15 @@
+from typing import Optional
+
+
+def strong_etag(*parts: object) -> str:
+    return '"' + "-".join(str(p) for p in parts) + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # Weak comparison, as RFC 9110 requires for If-None-Match.
+    candidates = (c.strip() for c in if_none_match.split(","))
+    return etag in (c[2:] if c.startswith("W/") else c for c in candidates)
@@ -0,0 +1,77 @@
+import asyncio
+from collections import deque
+from time import monotonic
+from typing import Awaitable, Callable, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class Hedger:
+    # delay_ms > 0 hedges after a fixed delay; delay_ms == "auto" uses the observed p90; 0 disables hedging.
+    def __init__(self, delay_ms: str, max_fraction: float, window: int = 200, min_samples: int = 20):
+        self.delay_ms = delay_ms
+        self.max_fraction = max_fraction
+        self.min_samples = min_samples
+        self._latencies: deque = deque(maxlen=window)
+        self.stats = {"calls": 0, "fired": 0, "won": 0, "over_budget": 0}
+
+    def _delay_seconds(self) -> Optional[float]:
+        if self.delay_ms == "auto":
+            if len(self._latencies) < self.min_samples:
+                return None
+            ordered = sorted(self._latencies)
+            return ordered[int(len(ordered) * 0.9) - 1]
+        delay = float(self.delay_ms or 0)
+        return delay / 1000 if delay > 0 else None
+
+    def _within_budget(self) -> bool:
+        return self.stats["fired"] < self.max_fraction * self.stats["calls"]
+
+    async def _timed(self, fn: Callable[[], Awaitable[T]], primary: bool) -> T:
+        started = monotonic()
+        cancelled = False
+        try:
+            return await fn()
+        except asyncio.CancelledError:
+            cancelled = True
+            raise
+        finally:
+            # Every primary counts, including the slow ones that failed or lost to a hedge; leaving them out
+            # biases the p90 low. A hedge cancelled because the primary won only shows how late it started.
+            if primary or not cancelled:
+                self._latencies.append(monotonic() - started)
+
+    async def run(self, fn: Callable[[], Awaitable[T]]) -> T:
+        self.stats["calls"] += 1
+        first = asyncio.ensure_future(self._timed(fn, primary=True))
+
+        delay = self._delay_seconds()
+        if delay is None:
+            return await first
+
+        tasks = [first]
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if not done:
+                if self._within_budget():
+                    self.stats["fired"] += 1
+                    tasks.append(asyncio.ensure_future(self._timed(fn, primary=False)))
+                else:
+                    self.stats["over_budget"] += 1
+
+            # The first successful result wins; a failure only counts once every call has failed.
+            pending = set(tasks)
+            error: Optional[BaseException] = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is not first:
+                            self.stats["won"] += 1
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
@@ -0,0 +1,139 @@
+import asyncio
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Opt-in: requests slower than PROFILE_SLOW_REQUEST_MS leave a collapsed-stack file in PROFILE_DIR
+# (flamegraph.pl, speedscope and inferno all read it). 0 disables the sampler entirely.
+PROFILE_SLOW_REQUEST_MS = float(os.getenv("PROFILE_SLOW_REQUEST_MS", "0"))
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+PROFILE_DIR = os.getenv("PROFILE_DIR", "./profiles")
+
+
+class _Trace:
+    def __init__(self, task: asyncio.Task, thread_id: int):
+        self.task = task
+        self.thread_id = thread_id
+        self.samples: Counter = Counter()
+
+
+def _label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_qualname} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def _task_stack(task: asyncio.Task, thread_frame) -> List[str]:
+    """The task's await chain, continued into the thread's stack when the task is the one running."""
+    frames = []
+    awaitable = task.get_coro()
+    while awaitable is not None:
+        frame = getattr(awaitable, "cr_frame", None) or getattr(awaitable, "gi_frame", None)
+        if frame is None:
+            break
+        frames.append(frame)
+        awaitable = getattr(awaitable, "cr_await", None) or getattr(awaitable, "gi_yieldfrom", None)
+    if not frames:
+        return []
+
+    stack = [_label(f) for f in frames]
+    running = []
+    frame = thread_frame
+    while frame is not None and frame is not frames[-1]:
+        running.append(frame)
+        frame = frame.f_back
+    if frame is None:
+        # Suspended: the time is spent waiting on whatever the innermost coroutine awaits.
+        stack.append("[await]")
+    else:
+        stack.extend(_label(f) for f in reversed(running))
+    return stack
+
+
+class SlowRequestProfiler:
+    """Samples the async call stack of every in-flight request from a background thread.
+
+    Suspended requests are sampled too, so the profile shows wall-clock time (DB, LLM and lock
+    waits included), not only CPU time. Only requests over the threshold are written out, by the
+    sampler thread, so the event loop never blocks on the file system.
+    """
+
+    def __init__(self, threshold_ms: float, interval_ms: float, directory: str):
+        self.threshold_ms = threshold_ms
+        self.interval = interval_ms / 1000
+        self.directory = directory
+        self.enabled = threshold_ms > 0
+        self._traces: Dict[int, _Trace] = {}
+        self._finished: List[Tuple[_Trace, float, str]] = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def begin(self) -> Optional[_Trace]:
+        if not self.enabled:
+            return None
+        task = asyncio.current_task()
+        if task is None:
+            return None
+        trace = _Trace(task, threading.get_ident())
+        with self._lock:
+            self._traces[id(trace)] = trace
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="slow-request-profiler", daemon=True)
+                self._thread.start()
+        return trace
+
+    def end(self, trace: _Trace, elapsed: float, label: str) -> None:
+        with self._lock:
+            self._traces.pop(id(trace), None)
+            if elapsed * 1000 >= self.threshold_ms:
+                self._finished.append((trace, elapsed, label))
+
+    def _write(self, trace: _Trace, elapsed: float, label: str) -> None:
+        if not trace.samples:
+            return
+        slug = re.sub(r"[^A-Za-z0-9]+", "_", label).strip("_")
+        path = os.path.join(self.directory, f"{int(time.time() * 1000)}-{slug}-{int(elapsed * 1000)}ms.folded")
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(path, "w") as f:
+                for stack, count in trace.samples.most_common():
+                    f.write(f"{stack} {count}\n")
+        except OSError:
+            logger.exception("Failed to write slow-request profile %s", path)
+
+    def _write_finished(self) -> None:
+        with self._lock:
+            finished, self._finished = self._finished, []
+        for trace, elapsed, label in finished:
+            self._write(trace, elapsed, label)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self._write_finished()
+            with self._lock:
+                traces = list(self._traces.values())
+            if not traces:
+                continue
+            thread_frames = sys._current_frames()
+            for trace in traces:
+                try:
+                    stack = _task_stack(trace.task, thread_frames.get(trace.thread_id))
+                except (AttributeError, ValueError):
+                    # The coroutine finished or moved while being walked; skip this sample.
+                    continue
+                if stack:
+                    trace.samples[";".join(stack)] += 1
+        self._write_finished()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+
+profiler = SlowRequestProfiler(PROFILE_SLOW_REQUEST_MS, PROFILE_INTERVAL_MS, PROFILE_DIR)
@@ -0,0 +1,53 @@
+import time
+from typing import Callable
+
+from sqlalchemy import func, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from models import RateLimitBucket
+
+
+class TokenBucketLimiter:
+    # Buckets live in the database so every worker process draws from the same budget.
+    def __init__(self, session_factory: Callable[[], Session], capacity: float, refill_per_second: float):
+        self.session_factory = session_factory
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+
+    def _refilled(self, now: float):
+        elapsed = func.max(now - RateLimitBucket.updated_at, 0)
+        return func.min(self.capacity, RateLimitBucket.tokens + elapsed * self.refill_per_second)
+
+    # Takes one token for `key`; returns 0 when allowed, otherwise the seconds until a token is available.
+    def acquire(self, key: str) -> float:
+        now = time.time()
+        db = self.session_factory()
+        try:
+            # Single conditional UPDATE: refill, check and spend happen atomically under SQLite's write lock.
+            taken = db.execute(
+                update(RateLimitBucket)
+                .where(RateLimitBucket.key == key, self._refilled(now) >= 1)
+                .values(tokens=self._refilled(now) - 1, updated_at=now)
+                .execution_options(synchronize_session=False)
+            ).rowcount
+            if taken:
+                db.commit()
+                return 0.0
+
+            row = db.get(RateLimitBucket, key)
+            if row is None:
+                db.add(RateLimitBucket(key=key, tokens=self.capacity - 1, updated_at=now))
+                try:
+                    db.commit()
+                    return 0.0
+                except IntegrityError:
+                    # Another worker created the bucket first; retry against it.
+                    db.rollback()
+                    return self.acquire(key)
+
+            db.rollback()
+            tokens = min(self.capacity, row.tokens + max(now - row.updated_at, 0) * self.refill_per_second)
+            return max((1 - tokens) / self.refill_per_second, 0.001)
+        finally:
+            db.close()
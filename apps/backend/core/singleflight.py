@@ -0,0 +1,30 @@
+import asyncio
+from typing import Awaitable, Callable, Dict, TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    def __init__(self):
+        self._inflight: Dict[str, "asyncio.Future"] = {}
+        self.stats = {"leaders": 0, "followers": 0}
+
+    def _forget(self, key: str, fut: "asyncio.Future") -> None:
+        if self._inflight.get(key) is fut:
+            del self._inflight[key]
+        # Mark the outcome as retrieved even if every waiter went away.
+        if not fut.cancelled():
+            fut.exception()
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[T]]) -> T:
+        fut = self._inflight.get(key)
+        if fut is None:
+            fut = asyncio.ensure_future(fn())
+            self._inflight[key] = fut
+            fut.add_done_callback(lambda f: self._forget(key, f))
+            self.stats["leaders"] += 1
+        else:
+            self.stats["followers"] += 1
+
+        # A caller disconnecting must not cancel the call the others are waiting on.
+        return await asyncio.shield(fut)
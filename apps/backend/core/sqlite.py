@@ -0,0 +1,160 @@
+import asyncio
+import os
+import threading
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, sessionmaker
+
+from core.metrics import registry
+
+# SQLITE_TUNING=0 keeps the driver defaults (rollback journal, default cache and sync), e.g. for benchmark baselines.
+SQLITE_TUNING = os.getenv("SQLITE_TUNING", "1") == "1"
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", "65536"))
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+SQLITE_SERIALIZE_WRITES = os.getenv("SQLITE_SERIALIZE_WRITES", "1") == "1"
+
+_WRITE_LOCK_KEY = "sqlite_write_lock"
+
+
+def configure_sqlite(engine: Engine) -> None:
+    @event.listens_for(engine, "connect")
+    def _set_pragmas(dbapi_connection, connection_record) -> None:
+        cursor = dbapi_connection.cursor()
+        try:
+            # WAL lets readers run alongside the writer; NORMAL only fsyncs at checkpoints, which is safe under WAL.
+            cursor.execute("PRAGMA journal_mode=WAL")
+            cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+            cursor.execute("PRAGMA synchronous=NORMAL")
+            cursor.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KB}")
+            cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+            cursor.execute("PRAGMA temp_store=MEMORY")
+        finally:
+            cursor.close()
+
+
+class WriteSerializer:
+    """One writing session per process at a time; SQLite allows a single writer anyway, this queues them in
+    order instead of letting them race for the file lock and fail with 'database is locked'."""
+
+    def __init__(self, timeout_seconds: float):
+        self.timeout_seconds = timeout_seconds
+        # Shared by sync and async sessions; a threading.Lock may be released from any thread.
+        self._lock = threading.Lock()
+        self._async_waiters: Optional[asyncio.Lock] = None
+        self.stats = {"acquired": 0, "timeouts": 0}
+
+    def _acquired(self, session, acquired: bool) -> None:
+        if acquired:
+            session.info[_WRITE_LOCK_KEY] = True
+            self.stats["acquired"] += 1
+        else:
+            # Fall back to SQLite's own busy handling rather than failing the request here.
+            self.stats["timeouts"] += 1
+
+    def acquire(self, session: Session) -> None:
+        if session.info.get(_WRITE_LOCK_KEY):
+            return
+        # Sessions hop between threadpool threads within a request, so ownership is tracked on the session.
+        self._acquired(session, self._lock.acquire(timeout=self.timeout_seconds))
+
+    async def acquire_async(self, session: AsyncSession) -> None:
+        if session.info.get(_WRITE_LOCK_KEY):
+            return
+        if self._lock.acquire(blocking=False):
+            self._acquired(session, True)
+            return
+
+        # Async writers queue on the event loop; only the one at the head waits for the shared lock in a thread.
+        if self._async_waiters is None:
+            self._async_waiters = asyncio.Lock()
+        try:
+            await asyncio.wait_for(self._async_waiters.acquire(), self.timeout_seconds)
+        except asyncio.TimeoutError:
+            self._acquired(session, False)
+            return
+        try:
+            waiting = asyncio.get_running_loop().run_in_executor(None, self._lock.acquire, True, self.timeout_seconds)
+            try:
+                acquired = await asyncio.shield(waiting)
+            except asyncio.CancelledError:
+                # The thread may still get the lock after the request is gone; hand it straight back.
+                waiting.add_done_callback(self._release_abandoned)
+                raise
+        finally:
+            self._async_waiters.release()
+        self._acquired(session, acquired)
+
+    def _release_abandoned(self, waiting: asyncio.Future) -> None:
+        if not waiting.cancelled() and waiting.exception() is None and waiting.result():
+            self._lock.release()
+
+    def release(self, session) -> None:
+        if session.info.pop(_WRITE_LOCK_KEY, False):
+            self._lock.release()
+
+    def install(self, factory: sessionmaker) -> None:
+        @event.listens_for(factory, "before_flush")
+        def _before_flush(session, flush_context, instances) -> None:
+            self.acquire(session)
+
+        @event.listens_for(factory, "do_orm_execute")
+        def _before_dml(orm_execute_state) -> None:
+            if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+                self.acquire(orm_execute_state.session)
+
+        @event.listens_for(factory, "after_transaction_end")
+        def _after_transaction_end(session, transaction) -> None:
+            if transaction.parent is None:
+                self.release(session)
+
+
+write_serializer = WriteSerializer(timeout_seconds=SQLITE_BUSY_TIMEOUT_MS / 1000)
+registry.stats_counter("sqlite_write_lock_total", "Writer lock acquisitions and timeouts.", write_serializer.stats)
+
+
+class SerializedAsyncSession(AsyncSession):
+    """AsyncSession counterpart of WriteSerializer, taking the same lock without blocking the loop, so async
+    writers also queue behind sync ones (threadpool routes, the job claimer, usage and rate-limit writes)."""
+
+    async def _acquire_write(self) -> None:
+        await write_serializer.acquire_async(self)
+
+    def _release_write(self) -> None:
+        write_serializer.release(self)
+
+    def _has_pending_writes(self) -> bool:
+        return bool(self.new or self.dirty or self.deleted)
+
+    async def execute(self, statement, *args, **kwargs):
+        if getattr(statement, "is_dml", False):
+            await self._acquire_write()
+        return await super().execute(statement, *args, **kwargs)
+
+    async def flush(self, objects=None) -> None:
+        if self._has_pending_writes():
+            await self._acquire_write()
+        await super().flush(objects)
+
+    async def commit(self) -> None:
+        if self._has_pending_writes():
+            await self._acquire_write()
+        try:
+            await super().commit()
+        finally:
+            self._release_write()
+
+    async def rollback(self) -> None:
+        try:
+            await super().rollback()
+        finally:
+            self._release_write()
+
+    async def close(self) -> None:
+        try:
+            await super().close()
+        finally:
+            self._release_write()
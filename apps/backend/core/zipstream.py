@@ -0,0 +1,43 @@
+import io
+import zipfile
+from datetime import datetime
+
+
+class _Sink(io.RawIOBase):
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, b) -> int:
+        self._chunks.append(bytes(b))
+        return len(b)
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+class ZipStream:
+    """Builds a ZIP archive incrementally; drain() returns the bytes produced since the last call.
+
+    The sink is not seekable, so zipfile writes data descriptors after each entry and never rewinds.
+    """
+
+    def __init__(self, compression: int = zipfile.ZIP_DEFLATED):
+        self._sink = _Sink()
+        self._zip = zipfile.ZipFile(self._sink, mode="w", compression=compression)
+
+    def add(self, name: str, data: bytes, modified: datetime) -> None:
+        info = zipfile.ZipInfo(name, date_time=modified.timetuple()[:6])
+        info.compress_type = self._zip.compression
+        self._zip.writestr(info, data)
+
+    def drain(self) -> bytes:
+        return self._sink.drain()
+
+    def close(self) -> bytes:
+        self._zip.close()
+        return self._sink.drain()
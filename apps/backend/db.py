@@ -1,16 +1,71 @@
 import os
 from sqlalchemy import create_engine
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, DeclarativeBase
 
+from core.async_session import SyncSessionAdapter
+from core.metrics import instrument_engine
+from core.sqlite import (
+    SQLITE_SERIALIZE_WRITES,
+    SQLITE_TUNING,
+    SerializedAsyncSession,
+    configure_sqlite,
+    write_serializer,
+)
+
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./app.db")
 
+# Routers use the async session API; DB_ASYNC=0 serves it from the sync engine on the threadpool instead.
+DB_ASYNC = os.getenv("DB_ASYNC", "1") == "1"
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or (
+    DATABASE_URL.replace("sqlite://", "sqlite+aiosqlite://", 1) if DATABASE_URL.startswith("sqlite://") else ""
+)
+
+# Sized for the threadpool: every concurrent sync request may hold one connection.
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "20"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+
+_is_sqlite = DATABASE_URL.startswith("sqlite")
+
+# INSERT with on_conflict_do_update() for upserts; both dialects share that API.
+upsert_insert = postgresql.insert if DATABASE_URL.startswith("postgres") else sqlite.insert
+_pool_args = (
+    {}
+    if ":memory:" in DATABASE_URL
+    else {"pool_size": DB_POOL_SIZE, "max_overflow": DB_MAX_OVERFLOW, "pool_timeout": DB_POOL_TIMEOUT}
+)
+
 engine = create_engine(
     DATABASE_URL,
-    connect_args={"check_same_thread": False} if DATABASE_URL.startswith("sqlite") else {},
+    connect_args={"check_same_thread": False} if _is_sqlite else {},
+    **_pool_args,
 )
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+if _is_sqlite and SQLITE_TUNING:
+    configure_sqlite(engine)
+if _is_sqlite and SQLITE_SERIALIZE_WRITES:
+    write_serializer.install(SessionLocal)
+instrument_engine(engine)
+
+async_engine = None
+AsyncSessionLocal = None
+if DB_ASYNC and ASYNC_DATABASE_URL:
+    async_engine = create_async_engine(ASYNC_DATABASE_URL, **_pool_args)
+    if _is_sqlite and SQLITE_TUNING:
+        configure_sqlite(async_engine.sync_engine)
+    instrument_engine(async_engine.sync_engine)
+    AsyncSessionLocal = async_sessionmaker(
+        async_engine,
+        class_=SerializedAsyncSession if _is_sqlite and SQLITE_SERIALIZE_WRITES else AsyncSession,
+        autoflush=False,
+        # Attribute access after commit must not trigger lazy IO outside the session's await points.
+        expire_on_commit=False,
+    )
+
 class Base(DeclarativeBase):
     pass
 
@@ -20,3 +75,12 @@ def get_db():
         yield db
     finally:
         db.close()
+
+def async_session():
+    if AsyncSessionLocal is not None:
+        return AsyncSessionLocal()
+    return SyncSessionAdapter(SessionLocal(expire_on_commit=False))
+
+async def get_async_db():
+    async with async_session() as db:
+        yield db
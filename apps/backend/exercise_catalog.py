@@ -0,0 +1,256 @@
+import asyncio
+import heapq
+import logging
+import os
+import re
+import unicodedata
+from bisect import bisect_left, insort
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.metrics import registry
+from db import async_session, upsert_insert
+from models import CatalogExercise, CatalogExerciseUser
+from schemas import ProgramOK, ProgramResponse
+
+EXERCISE_NAME_MAX_LENGTH = int(os.getenv("EXERCISE_NAME_MAX_LENGTH", "60"))
+# List items are free text: a name is only suggested to everyone once this many distinct users have saved it.
+EXERCISE_SUGGEST_MIN_USERS = int(os.getenv("EXERCISE_SUGGEST_MIN_USERS", "3"))
+# The index is per process and only follows this process's commits; saves made by other web workers and by
+# worker.py show up after the next reload from the table. 0 disables the reload.
+EXERCISE_CATALOG_REFRESH_SECONDS = float(os.getenv("EXERCISE_CATALOG_REFRESH_SECONDS", "60"))
+
+logger = logging.getLogger(__name__)
+
+_WORD = re.compile(r"[^\W_]+")
+
+
+# Prefixes matching more index entries than this have their best matches cached instead of ranked per keystroke.
+_RANK_UNCACHED_MAX = 256
+_CACHED_RESULTS = 50
+
+
+def _singular(key: str) -> str:
+    # Deliberately crude: enough to fold "pushups"/"pushup" and "squats"/"squat" without touching "press".
+    if len(key) > 3 and key.endswith("s") and not key.endswith("ss"):
+        return key[:-1]
+    return key
+
+
+def _key_words(name: str) -> List[str]:
+    decomposed = unicodedata.normalize("NFKD", name)
+    folded = "".join(ch for ch in decomposed if not unicodedata.combining(ch)).casefold()
+    return _WORD.findall(folded)
+
+
+def catalog_key(name: str) -> str:
+    """Case, accents, punctuation, spacing and a trailing plural "s" are ignored."""
+    return _singular("".join(_key_words(name)))
+
+
+def display_name(name: str) -> str:
+    return " ".join(name.split())
+
+
+def program_exercise_names(program: ProgramResponse) -> List[str]:
+    if not isinstance(program, ProgramOK):
+        return []
+    return [e.name for day in program.days for e in day.exercises]
+
+
+class CatalogIndex:
+    """In-memory prefix index over the catalog: a sorted array searched with bisect.
+
+    Every entry is indexed from each word start, so "squ" also finds "Goblet squat".
+    """
+
+    def __init__(self, min_users: int):
+        self.min_users = min_users
+        self._index: List[Tuple[str, str]] = []
+        self._names: Dict[str, str] = {}
+        self._uses: Dict[str, int] = {}
+        self._users: Dict[str, int] = {}
+        self._top: Dict[str, List[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def load(self, entries: Iterable[Tuple[str, str, int, int]]) -> None:
+        self._names = {}
+        self._uses = {}
+        self._users = {}
+        index = []
+        for key, name, uses, users in entries:
+            self._names[key] = name
+            self._uses[key] = uses
+            self._users[key] = users
+            index.extend((suffix, key) for suffix in self._suffixes(name))
+        index.sort()
+        self._index = index
+        self._top = {}
+
+    def add(self, key: str, name: str, uses: int, users: int) -> None:
+        suffixes = self._suffixes(name)
+        for suffix in suffixes:
+            for n in range(1, len(suffix) + 1):
+                self._top.pop(suffix[:n], None)
+
+        if key in self._names:
+            self._uses[key] += uses
+            self._users[key] += users
+            return
+        self._names[key] = name
+        self._uses[key] = uses
+        self._users[key] = users
+        for suffix in suffixes:
+            insort(self._index, (suffix, key))
+
+    def add_all(self, entries: Iterable[Tuple[str, str, int, int]]) -> None:
+        for key, name, uses, users in entries:
+            self.add(key, name, uses, users)
+
+    @staticmethod
+    def _suffixes(name: str) -> List[str]:
+        words = _key_words(name)
+        return [_singular("".join(words[i:])) for i in range(len(words))]
+
+    def suggest(self, query: str, limit: int) -> List[str]:
+        prefix = catalog_key(query)
+        if not prefix:
+            return []
+        best = self._top.get(prefix) if limit <= _CACHED_RESULTS else None
+        if best is None:
+            lo = bisect_left(self._index, (prefix,))
+            hi = bisect_left(self._index, (prefix + "\uffff",), lo)
+            cache = hi - lo > _RANK_UNCACHED_MAX and limit <= _CACHED_RESULTS
+            keys = {key for _, key in self._index[lo:hi] if self._users[key] >= self.min_users}
+            # Matches from the first word first, then the most used.
+            best = heapq.nsmallest(
+                _CACHED_RESULTS if cache else limit,
+                keys,
+                key=lambda k: (not k.startswith(prefix), -self._uses[k], self._names[k]),
+            )
+            if cache:
+                self._top[prefix] = best
+        return [self._names[k] for k in best[:limit]]
+
+
+catalog_index = CatalogIndex(EXERCISE_SUGGEST_MIN_USERS)
+registry.gauge_function("exercise_catalog_entries", "Entries in the in-memory exercise index.", catalog_index.__len__)
+
+
+async def load_catalog() -> None:
+    async with async_session() as db:
+        rows = (
+            await db.execute(
+                select(CatalogExercise.key, CatalogExercise.name, CatalogExercise.uses, CatalogExercise.users)
+            )
+        ).all()
+    catalog_index.load(rows)
+
+
+_refresh_task: Optional[asyncio.Task] = None
+
+
+async def _refresh_forever(interval: float) -> None:
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            # A local commit racing the reload can be counted twice or missed; the next reload corrects it.
+            await load_catalog()
+        except Exception:
+            logger.exception("Could not reload the exercise catalog")
+
+
+async def start_catalog() -> None:
+    global _refresh_task
+    await load_catalog()
+    if EXERCISE_CATALOG_REFRESH_SECONDS > 0 and _refresh_task is None:
+        _refresh_task = asyncio.create_task(_refresh_forever(EXERCISE_CATALOG_REFRESH_SECONDS))
+
+
+async def stop_catalog() -> None:
+    global _refresh_task
+    if _refresh_task is not None:
+        _refresh_task.cancel()
+        await asyncio.gather(_refresh_task, return_exceptions=True)
+        _refresh_task = None
+
+
+_PENDING_KEY = "catalog_pending"
+
+
+def _pending_index_updates(db: AsyncSession) -> list:
+    """Index updates made in db's transaction: applied on the event loop once it commits, dropped otherwise."""
+    pending = db.info.get(_PENDING_KEY)
+    if pending is not None:
+        return pending
+    pending = db.info[_PENDING_KEY] = []
+    # DB_ASYNC=0 commits on a threadpool thread; the index itself is only ever touched from the loop.
+    loop = asyncio.get_running_loop()
+
+    @event.listens_for(db.sync_session, "after_commit")
+    def _apply(session) -> None:
+        if pending:
+            loop.call_soon_threadsafe(catalog_index.add_all, pending[:])
+            pending.clear()
+
+    @event.listens_for(db.sync_session, "after_transaction_end")
+    def _discard(session, transaction) -> None:
+        if transaction.parent is None:
+            pending.clear()
+
+    return pending
+
+
+async def record_exercises(db: AsyncSession, user_id: str, names: Iterable[str]) -> None:
+    """Upserts the names into the catalog, counting each occurrence as a use; the in-memory index follows on commit."""
+    await record_exercise_counts(db, user_id, Counter(names))
+
+
+async def record_exercise_counts(db: AsyncSession, user_id: str, counts: Dict[str, int]) -> None:
+    uses: Counter = Counter()
+    names_by_key: Dict[str, str] = {}
+    for name, count in counts.items():
+        if len(name) > EXERCISE_NAME_MAX_LENGTH:
+            continue
+        key = catalog_key(name)
+        if not key:
+            continue
+        uses[key] += count
+        names_by_key.setdefault(key, display_name(name))
+    if not uses:
+        return
+
+    # Sorted so concurrent writers touch rows in the same order.
+    keys = sorted(uses)
+    # Only the pairs inserted here are returned: entries this user had never saved gain one distinct user.
+    first_uses = set(
+        (
+            await db.execute(
+                upsert_insert(CatalogExerciseUser)
+                .values([{"key": key, "user_id": user_id} for key in keys])
+                .on_conflict_do_nothing()
+                .returning(CatalogExerciseUser.key)
+            )
+        ).scalars()
+    )
+    entries = [(key, names_by_key[key], uses[key], int(key in first_uses)) for key in keys]
+
+    stmt = upsert_insert(CatalogExercise).values(
+        [{"key": key, "name": name, "uses": count, "users": users} for key, name, count, users in entries]
+    )
+    await db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[CatalogExercise.key],
+            set_={
+                "uses": CatalogExercise.uses + stmt.excluded.uses,
+                "users": CatalogExercise.users + stmt.excluded.users,
+            },
+        )
+    )
+
+    _pending_index_updates(db).extend(entries)
@@ -0,0 +1,59 @@
+import os
+
+from fastapi import Depends, HTTPException
+from starlette.concurrency import run_in_threadpool
+
+from ai import AI_MAX_CONCURRENCY
+from auth import Principal, get_current_user
+from core.admission import AdmissionQueue, retry_after_header
+from core.metrics import registry
+from core.ratelimit import TokenBucketLimiter
+from db import SessionLocal
+
+AI_RATE_LIMIT_BURST = float(os.getenv("AI_RATE_LIMIT_BURST", "5"))
+AI_RATE_LIMIT_PER_MINUTE = float(os.getenv("AI_RATE_LIMIT_PER_MINUTE", "6"))
+
+# Requests beyond the LLM concurrency cap may wait, but only up to AI_MAX_QUEUE of them.
+AI_MAX_QUEUE = int(os.getenv("AI_MAX_QUEUE", "200"))
+AI_QUEUE_RETRY_AFTER_SECONDS = int(os.getenv("AI_QUEUE_RETRY_AFTER_SECONDS", "10"))
+
+ai_rate_limiter = TokenBucketLimiter(
+    SessionLocal,
+    capacity=AI_RATE_LIMIT_BURST,
+    refill_per_second=AI_RATE_LIMIT_PER_MINUTE / 60,
+)
+
+ai_admission = AdmissionQueue(
+    capacity=AI_MAX_CONCURRENCY + AI_MAX_QUEUE,
+    retry_after_seconds=AI_QUEUE_RETRY_AFTER_SECONDS,
+)
+registry.stats_counter("ai_admission_total", "AI requests admitted or shed at capacity.", ai_admission.stats)
+registry.gauge_function(
+    "ai_admission_active", "AI requests running or waiting for an LLM slot.", lambda: ai_admission.active
+)
+
+
+def require_ai_rate(current_user: Principal = Depends(get_current_user)) -> Principal:
+    wait = ai_rate_limiter.acquire(f"ai:{current_user.id}")
+    if wait > 0:
+        raise HTTPException(
+            status_code=429,
+            detail={"code": "RATE_LIMITED", "message": "Too many AI requests. Try again shortly."},
+            headers=retry_after_header(wait),
+        )
+    return current_user
+
+
+async def admit_ai(current_user: Principal) -> None:
+    """Takes a place in the AI queue, then one of the user's rate tokens (503 / 429 when refused).
+
+    Runs on the event loop so the capacity check and the claim cannot interleave; the caller
+    gives the place back with ai_admission.release().
+    """
+    # Shed before spending the user's token so a full queue does not also eat their quota.
+    ai_admission.try_enter()
+    try:
+        await run_in_threadpool(require_ai_rate, current_user)
+    except BaseException:
+        ai_admission.release()
+        raise
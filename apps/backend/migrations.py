@@ -0,0 +1,74 @@
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.schema import Table
+
+from db import Base
+from search import create_search_index
+
+
+def _add_missing_columns(engine: Engine) -> None:
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+            present = {c["name"] for c in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in present:
+                    continue
+                # Only columns that can be added in place: nullable or carrying a server default.
+                ddl = f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column.type.compile(engine.dialect)}"
+                if column.server_default is not None:
+                    ddl += f" DEFAULT {column.server_default.arg}"
+                    if not column.nullable:
+                        ddl += " NOT NULL"
+                conn.execute(text(ddl))
+
+
+def _rebuild_table(conn: Connection, table: Table) -> None:
+    # SQLite cannot alter a column constraint in place: copy the rows into a freshly created table.
+    old = f"_{table.name}_old"
+    conn.execute(text(f"ALTER TABLE {table.name} RENAME TO {old}"))
+    for index in table.indexes:
+        conn.execute(text(f"DROP INDEX IF EXISTS {index.name}"))
+    table.create(conn)
+
+    columns = ", ".join(c.name for c in table.columns)
+    conn.execute(text(f"INSERT INTO {table.name} ({columns}) SELECT {columns} FROM {old}"))
+    conn.execute(text(f"DROP TABLE {old}"))
+
+
+def _relax_not_null(engine: Engine) -> None:
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+
+    for table in Base.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        db_nullable = {c["name"]: c["nullable"] for c in inspector.get_columns(table.name)}
+        relaxed = [c for c in table.columns if c.nullable and db_nullable.get(c.name) is False]
+        if not relaxed:
+            continue
+
+        with engine.begin() as conn:
+            if engine.dialect.name == "sqlite":
+                _rebuild_table(conn, table)
+            else:
+                for column in relaxed:
+                    conn.execute(text(f"ALTER TABLE {table.name} ALTER COLUMN {column.name} DROP NOT NULL"))
+
+
+def run_migrations(engine: Engine) -> None:
+    """Idempotent schema upgrades for databases created before a change; runs after create_all."""
+    _add_missing_columns(engine)
+    _relax_not_null(engine)
+
+    # create_all skips tables that already exist, so indexes added to existing models are created here.
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+
+    # Virtual tables are outside the metadata; a new index starts empty until scripts.rebuild_search_index runs.
+    create_search_index(engine)
@@ -1,9 +1,10 @@
 import uuid
-from sqlalchemy import Column, String, Text, DateTime, ForeignKey
+from sqlalchemy import Column, String, Text, DateTime, ForeignKey, Integer, Float, Boolean, Index, LargeBinary, false
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from datetime import datetime
 
 from db import Base
+from compact_json import CompactJSON
 
 def uuid_str():
     return str(uuid.uuid4())
@@ -14,9 +15,13 @@ class User(Base):
     id: Mapped[str] = mapped_column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
     email: Mapped[str] = mapped_column(String, unique=True, index=True, nullable=False)
     password_hash: Mapped[str] = mapped_column(String, nullable=False)
+    # False for users who predate WorkoutStats: their deltas are skipped until scripts.backfill_workout_stats runs.
+    stats_backfilled: Mapped[bool] = mapped_column(Boolean, nullable=False, default=True, server_default=false())
 
 class WorkoutProgram(Base):
     __tablename__ = "workout_programs"
+    # Covers the keyset listing (filter, order and summary columns) without touching the table rows.
+    __table_args__ = (Index("ix_workout_programs_user_created", "user_id", "created_at", "id", "title"),)
 
     id = Column(String, primary_key=True, default=uuid_str)
     user_id = Column(String, ForeignKey("users.id"), nullable=False)
@@ -24,16 +29,157 @@ class WorkoutProgram(Base):
     title = Column(String, nullable=False, default="My program")
     input_text = Column(Text, nullable=True)
     preferences_json = Column(Text, nullable=True)
-    program_json = Column(Text, nullable=False)
+    # Legacy inline body; new saves point at a shared ProgramBody through program_hash instead.
+    program_json = Column(CompactJSON, nullable=True)
+    program_hash = Column(String, ForeignKey("program_bodies.hash"), nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+
+    body = relationship("ProgramBody", lazy="joined")
+
+    # Every ORM update (e.g. a rename) bumps version, which backs the detail endpoint's ETag.
+    __mapper_args__ = {"version_id_col": version}
+
+    @property
+    def program_text(self) -> str:
+        return self.body.body if self.body is not None else self.program_json
+
+
+class ProgramBody(Base):
+    __tablename__ = "program_bodies"
+
+    # sha256 of the canonical program JSON; identical programs saved by anyone share one row.
+    hash = Column(String, primary_key=True)
+    body = Column(CompactJSON, nullable=False)
+    ref_count = Column(Integer, nullable=False, default=0)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
 
 
 class ExerciseList(Base):
     __tablename__ = "exercise_lists"
+    __table_args__ = (Index("ix_exercise_lists_user_created", "user_id", "created_at", "id", "name"),)
 
     id = Column(String, primary_key=True, default=uuid_str)
     user_id = Column(String, ForeignKey("users.id"), nullable=False)
 
     name = Column(String, nullable=False)
-    items_json = Column(Text, nullable=False)
+    items_json = Column(CompactJSON, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+class WorkoutStats(Base):
+    __tablename__ = "workout_stats"
+
+    # Running totals over the user's saved ProgramOK programs, adjusted by deltas on save and delete.
+    user_id = Column(String, ForeignKey("users.id"), primary_key=True)
+    programs = Column(Integer, nullable=False, default=0)
+    sessions = Column(Integer, nullable=False, default=0)
+    sets = Column(Integer, nullable=False, default=0)
+    minutes = Column(Integer, nullable=False, default=0)
+    calories = Column(Integer, nullable=False, default=0)
+    low_days = Column(Integer, nullable=False, default=0)
+    medium_days = Column(Integer, nullable=False, default=0)
+    high_days = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+class WorkoutExerciseCount(Base):
+    __tablename__ = "workout_exercise_counts"
+    __table_args__ = (Index("ix_workout_exercise_counts_user_count", "user_id", "count"),)
+
+    user_id = Column(String, ForeignKey("users.id"), primary_key=True)
+    key = Column(String, primary_key=True)
+    name = Column(String, nullable=False)
+    count = Column(Integer, nullable=False, default=0)
+
+
+class CatalogExercise(Base):
+    __tablename__ = "exercise_catalog"
+
+    # Normalized name (see exercise_catalog.catalog_key): "Push-ups", "push up" and "Pushups" share one row.
+    key = Column(String, primary_key=True)
+    name = Column(String, nullable=False)
+    uses = Column(Integer, nullable=False, default=0)
+    # Distinct users who saved the name; suggestions only show entries shared by several of them.
+    users = Column(Integer, nullable=False, default=0, server_default="0")
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+class CatalogExerciseUser(Base):
+    __tablename__ = "exercise_catalog_users"
+
+    key = Column(String, primary_key=True)
+    user_id = Column(String, ForeignKey("users.id"), primary_key=True)
+
+
+class SearchDocument(Base):
+    __tablename__ = "search_documents"
+    __table_args__ = (Index("ix_search_documents_item", "kind", "item_id", unique=True),)
+
+    # Also the rowid of the item's row in the search_index FTS5 table.
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    kind = Column(String, nullable=False)
+    item_id = Column(String, nullable=False)
+    created_at = Column(DateTime, nullable=False)
+
+
+class CompressionDictionary(Base):
+    __tablename__ = "compression_dictionaries"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    data = Column(LargeBinary, nullable=False)
+    samples = Column(Integer, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+class ProgramCacheEntry(Base):
+    __tablename__ = "ai_program_cache"
+
+    key = Column(String, primary_key=True)
+    response_json = Column(Text, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
+
+
+class AIUsage(Base):
+    __tablename__ = "ai_usage"
+
+    id = Column(String, primary_key=True, default=uuid_str)
+    user_id = Column(String, ForeignKey("users.id"), nullable=True, index=True)
+
+    kind = Column(String, nullable=False)
+    model = Column(String, nullable=False)
+    input_tokens = Column(Integer, nullable=False, default=0)
+    output_tokens = Column(Integer, nullable=False, default=0)
+    max_output_tokens = Column(Integer, nullable=False)
+    latency_ms = Column(Integer, nullable=False)
+    outcome = Column(String, nullable=False)
+    days = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
+
+
+class RateLimitBucket(Base):
+    __tablename__ = "rate_limit_buckets"
+
+    key = Column(String, primary_key=True)
+    tokens = Column(Float, nullable=False)
+    updated_at = Column(Float, nullable=False)
+
+
+class AIJob(Base):
+    __tablename__ = "ai_jobs"
+    __table_args__ = (Index("ix_ai_jobs_status_created", "status", "created_at"),)
+
+    id = Column(String, primary_key=True, default=uuid_str)
+    user_id = Column(String, ForeignKey("users.id"), nullable=False, index=True)
+
+    status = Column(String, nullable=False, default="queued")
+    request_json = Column(Text, nullable=False)
+    auto_save = Column(Boolean, nullable=False, default=False)
+    title = Column(String, nullable=True)
+    result_json = Column(Text, nullable=True)
+    error_json = Column(Text, nullable=True)
+    workout_id = Column(String, nullable=True)
+    attempts = Column(Integer, nullable=False, default=0)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
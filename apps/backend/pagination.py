@@ -0,0 +1,80 @@
+import base64
+import json
+from datetime import datetime
+from typing import Optional, Tuple
+
+from fastapi import HTTPException, Response
+from sqlalchemy import Select, and_, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+PAGE_SIZE_DEFAULT = 50
+PAGE_SIZE_MAX = 200
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(created_at: datetime, row_id: str) -> str:
+    raw = json.dumps([created_at.isoformat(), row_id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _invalid_cursor() -> HTTPException:
+    return HTTPException(
+        status_code=400,
+        detail={"code": "INVALID_CURSOR", "message": "The pagination cursor is invalid."},
+    )
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, row_id = json.loads(raw)
+        return datetime.fromisoformat(created_at), str(row_id)
+    except (ValueError, TypeError):
+        raise _invalid_cursor()
+
+
+# Ranked results have no stable sort key to seek on, so their cursors carry an offset instead.
+def encode_offset_cursor(offset: int) -> str:
+    return base64.urlsafe_b64encode(json.dumps({"offset": offset}).encode()).decode().rstrip("=")
+
+
+def decode_offset_cursor(cursor: str) -> int:
+    try:
+        offset = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))["offset"]
+    except (ValueError, TypeError, KeyError):
+        raise _invalid_cursor()
+    if not isinstance(offset, int) or offset < 0:
+        raise _invalid_cursor()
+    return offset
+
+
+async def keyset_page(db: AsyncSession, stmt: Select, model, limit: Optional[int], cursor: Optional[str]):
+    """Newest first over (created_at, id); fetches one extra row to know whether a next page exists.
+
+    With neither limit nor cursor the whole list is returned, as it was before pagination, so clients
+    that never read X-Next-Cursor keep seeing every row.
+    """
+    stmt = stmt.order_by(model.created_at.desc(), model.id.desc())
+    if limit is None:
+        if not cursor:
+            return (await db.execute(stmt)).all(), None
+        limit = PAGE_SIZE_DEFAULT
+
+    if cursor:
+        created_at, row_id = decode_cursor(cursor)
+        stmt = stmt.where(
+            or_(
+                model.created_at < created_at,
+                and_(model.created_at == created_at, model.id < row_id),
+            )
+        )
+
+    rows = (await db.execute(stmt.limit(limit + 1))).all()
+    next_cursor = encode_cursor(rows[limit - 1].created_at, rows[limit - 1].id) if len(rows) > limit else None
+    return rows[:limit], next_cursor
+
+
+def set_next_cursor(response: Response, next_cursor: Optional[str]) -> None:
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
@@ -0,0 +1,62 @@
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Tuple
+
+from passlib.context import CryptContext
+
+# Kept free of app imports: pool workers only need this module and passlib.
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS") or os.cpu_count() or 1)
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "64"))
+
+# Changing BCRYPT_ROUNDS makes existing hashes "need update"; they are rehashed on the next login.
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pending: Optional[asyncio.Semaphore] = None
+
+
+def hash_password(password: str) -> str:
+    return pwd_context.hash(password)
+
+
+def verify_password(password: str, password_hash: str) -> bool:
+    return pwd_context.verify(password, password_hash)
+
+
+def verify_and_update(password: str, password_hash: str) -> Tuple[bool, Optional[str]]:
+    return pwd_context.verify_and_update(password, password_hash)
+
+
+def _executor() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        # The pool starts lazily inside a threaded server, where fork can copy a lock held by another thread.
+        method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+        _pool = ProcessPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, mp_context=multiprocessing.get_context(method))
+    return _pool
+
+
+async def _offload(fn, *args):
+    global _pending
+    if _pending is None:
+        _pending = asyncio.Semaphore(PASSWORD_HASH_MAX_PENDING)
+    async with _pending:
+        return await asyncio.get_running_loop().run_in_executor(_executor(), fn, *args)
+
+
+async def hash_password_async(password: str) -> str:
+    return await _offload(hash_password, password)
+
+
+async def verify_and_update_async(password: str, password_hash: str) -> Tuple[bool, Optional[str]]:
+    return await _offload(verify_and_update, password, password_hash)
+
+
+def shutdown() -> None:
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
@@ -0,0 +1,73 @@
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from db import get_db
+from models import User, AIUsage
+from auth import Principal, get_admin_user
+from ai_usage import cost_usd, output_budget
+from schemas import AIUsageReport, AIUsageSummary
+
+router = APIRouter(prefix="/api/admin", tags=["admin"])
+
+
+def _summary(rows, user_id=None, email=None) -> AIUsageSummary:
+    calls = sum(r.calls for r in rows)
+    input_tokens = sum(r.input_tokens or 0 for r in rows)
+    output_tokens = sum(r.output_tokens or 0 for r in rows)
+    latency = sum(r.latency_ms or 0 for r in rows)
+    outcomes = defaultdict(int)
+    for r in rows:
+        outcomes[r.outcome] += r.calls
+
+    return AIUsageSummary(
+        user_id=user_id,
+        email=email,
+        calls=calls,
+        input_tokens=input_tokens,
+        output_tokens=output_tokens,
+        cost_usd=round(cost_usd(input_tokens, output_tokens), 6),
+        avg_latency_ms=int(latency / calls) if calls else 0,
+        outcomes=dict(outcomes),
+    )
+
+
+@router.get("/ai-usage", response_model=AIUsageReport)
+def ai_usage_report(
+    days: int = Query(default=7, ge=1, le=365),
+    admin: Principal = Depends(get_admin_user),
+    db: Session = Depends(get_db),
+):
+    since = datetime.utcnow() - timedelta(days=days)
+    rows = (
+        db.query(
+            AIUsage.user_id,
+            User.email,
+            AIUsage.outcome,
+            func.count(AIUsage.id).label("calls"),
+            func.sum(AIUsage.input_tokens).label("input_tokens"),
+            func.sum(AIUsage.output_tokens).label("output_tokens"),
+            func.sum(AIUsage.latency_ms).label("latency_ms"),
+        )
+        .outerjoin(User, User.id == AIUsage.user_id)
+        .filter(AIUsage.created_at >= since)
+        .group_by(AIUsage.user_id, User.email, AIUsage.outcome)
+        .all()
+    )
+
+    by_user = defaultdict(list)
+    for r in rows:
+        by_user[(r.user_id, r.email)].append(r)
+
+    users = [_summary(user_rows, user_id=uid, email=email) for (uid, email), user_rows in by_user.items()]
+    users.sort(key=lambda s: s.cost_usd, reverse=True)
+
+    return AIUsageReport(
+        since=since.isoformat(),
+        tokens_per_day=round(output_budget.tokens_per_day, 1),
+        totals=_summary(rows),
+        users=users,
+    )
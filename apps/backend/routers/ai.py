@@ -1,23 +1,44 @@
+import json
+import weakref
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+from pydantic import TypeAdapter
+from sqlalchemy.orm import Session
 
-from models import User
-from auth import get_current_user
-from schemas import AIProgramRequest, ProgramOK, ProgramRejected
-from ai import generate_program
+from db import get_db
+from models import AIJob
+from auth import Principal, get_current_user
+from limits import admit_ai, ai_admission, require_ai_rate
+from schemas import (
+    AIProgramRequest,
+    AIJobRequest,
+    AIJobSubmitted,
+    AIJobStatus,
+    ProgramOK,
+    ProgramRejected,
+    ProgramResponse,
+)
+from ai import generate_program, request_preferences
+from ai_jobs import AI_JOB_MAX_QUEUED, job_pool, queued_count
+from ai_stream import stream_program
 
 router = APIRouter(prefix="/api/ai", tags=["ai"])
 
 
 @router.post("/program", response_model=ProgramOK)
-def ai_program(payload: AIProgramRequest, current_user: User = Depends(get_current_user)):
-    preferences = payload.preferences.model_dump() if payload.preferences else None
+async def ai_program(payload: AIProgramRequest, current_user: Principal = Depends(get_current_user)):
+    preferences = request_preferences(payload)
 
-    if preferences:
-        days = preferences.get("days_of_week") or None
-        if isinstance(days, list) and len(days) > 0:
-            preferences["sessions_per_week"] = len(days)
-
-    result = generate_program(payload.text, preferences=preferences)
+    await admit_ai(current_user)
+    try:
+        result = await generate_program(
+            payload.text,
+            preferences=preferences,
+            use_cache=not payload.fresh,
+            user_id=current_user.id,
+        )
+    finally:
+        ai_admission.release()
 
     if isinstance(result, ProgramRejected) and result.status == "rejected":
         raise HTTPException(
@@ -30,3 +51,80 @@ def ai_program(payload: AIProgramRequest, current_user: User = Depends(get_curre
         )
 
     return result
+
+
+@router.post("/program/stream")
+async def ai_program_stream(payload: AIProgramRequest, current_user: Principal = Depends(get_current_user)):
+    preferences = request_preferences(payload)
+
+    await admit_ai(current_user)
+
+    async def events():
+        try:
+            async for event in stream_program(
+                payload.text,
+                preferences=preferences,
+                use_cache=not payload.fresh,
+                user_id=current_user.id,
+            ):
+                yield event
+        finally:
+            release()
+
+    body = events()
+    # Also fires if the response is dropped before the generator ever starts; runs at most once.
+    release = weakref.finalize(body, ai_admission.release)
+
+    return StreamingResponse(
+        body,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.post("/jobs", response_model=AIJobSubmitted, status_code=202)
+def submit_job(
+    payload: AIJobRequest,
+    current_user: Principal = Depends(require_ai_rate),
+    db: Session = Depends(get_db),
+):
+    if queued_count(db) >= AI_JOB_MAX_QUEUED:
+        raise HTTPException(
+            status_code=503,
+            detail={"code": "AI_BUSY", "message": "Too many queued generations. Try again shortly."},
+            headers={"Retry-After": "30"},
+        )
+
+    job = AIJob(
+        user_id=current_user.id,
+        request_json=payload.model_dump_json(),
+        auto_save=payload.auto_save,
+        title=payload.title,
+    )
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+
+    job_pool.notify()
+    return AIJobSubmitted(id=job.id, status=job.status)
+
+
+@router.get("/jobs/{job_id}", response_model=AIJobStatus)
+def get_job(
+    job_id: str,
+    current_user: Principal = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    job = db.query(AIJob).filter(AIJob.user_id == current_user.id, AIJob.id == job_id).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Not found")
+
+    return AIJobStatus(
+        id=job.id,
+        status=job.status,
+        result=TypeAdapter(ProgramResponse).validate_json(job.result_json) if job.result_json else None,
+        error=json.loads(job.error_json) if job.error_json else None,
+        workout_id=job.workout_id,
+        created_at=job.created_at.isoformat(),
+        finished_at=job.finished_at.isoformat() if job.finished_at else None,
+    )
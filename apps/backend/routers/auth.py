@@ -1,38 +1,58 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from db import get_db
+from db import get_async_db
 from models import User
 from schemas import SignupRequest, LoginRequest, UserResponse, TokenResponse
-from auth import hash_password, verify_password, create_access_token, get_current_user
+from auth import create_access_token, Principal, get_current_user
+from passwords import hash_password_async, verify_and_update_async
 
 
 router = APIRouter(prefix="/api/auth", tags=["auth"])
 
 
+async def _find_by_email(db: AsyncSession, email: str):
+    return await db.scalar(select(User).where(User.email == email))
+
+
+async def _save(db: AsyncSession, user: User) -> None:
+    db.add(user)
+    await db.commit()
+    await db.refresh(user)
+
+
+# bcrypt runs in the password process pool; the event loop only awaits the result.
 @router.post("/signup", response_model=UserResponse, status_code=201)
-def signup(payload: SignupRequest, db: Session = Depends(get_db)):
-    existing = db.query(User).filter(User.email == payload.email).first()
+async def signup(payload: SignupRequest, db: AsyncSession = Depends(get_async_db)):
+    existing = await _find_by_email(db, payload.email)
     if existing:
         raise HTTPException(status_code=409, detail="Email already exists")
 
-    user = User(email=payload.email, password_hash=hash_password(payload.password))
-    db.add(user)
-    db.commit()
-    db.refresh(user)
+    user = User(email=payload.email, password_hash=await hash_password_async(payload.password))
+    await _save(db, user)
     return UserResponse(id=user.id, email=user.email)
 
 
 @router.post("/login", response_model=TokenResponse)
-def login(payload: LoginRequest, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.email == payload.email).first()
-    if not user or not verify_password(payload.password, user.password_hash):
+async def login(payload: LoginRequest, db: AsyncSession = Depends(get_async_db)):
+    user = await _find_by_email(db, payload.email)
+    if not user:
+        raise HTTPException(status_code=401, detail="Unauthorized")
+
+    ok, new_hash = await verify_and_update_async(payload.password, user.password_hash)
+    if not ok:
         raise HTTPException(status_code=401, detail="Unauthorized")
 
+    if new_hash:
+        # Cost parameters changed since this hash was made; upgrade it transparently.
+        user.password_hash = new_hash
+        await _save(db, user)
+
     token = create_access_token(subject=user.id)
     return TokenResponse(access_token=token, token_type="bearer")
 
 
 @router.get("/me", response_model=UserResponse)
-def me(current_user: User = Depends(get_current_user)):
+async def me(current_user: Principal = Depends(get_current_user)):
     return UserResponse(id=current_user.id, email=current_user.email)
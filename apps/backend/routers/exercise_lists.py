@@ -1,10 +1,17 @@
 import json
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from datetime import datetime
+from typing import Optional
 
-from db import get_db
-from models import User, ExerciseList
-from auth import get_current_user
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from db import get_async_db
+from models import ExerciseList, uuid_str
+from auth import Principal, get_current_user
+from exercise_catalog import record_exercises
+from search import exercise_list_doc, index_documents, remove_documents
+from pagination import PAGE_SIZE_MAX, keyset_page, set_next_cursor
 from schemas import (
     CreateExerciseListRequest,
     ExerciseListSummary,
@@ -15,43 +22,52 @@ router = APIRouter(prefix="/api/exercise-lists", tags=["exercise-lists"])
 
 
 @router.post("", response_model=ExerciseListSummary)
-def create_exercise_list(
+async def create_exercise_list(
     payload: CreateExerciseListRequest,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
 ):
     row = ExerciseList(
+        id=uuid_str(),
         user_id=current_user.id,
         name=payload.name,
         items_json=json.dumps(payload.items, ensure_ascii=False),
+        created_at=datetime.utcnow(),
     )
     db.add(row)
-    db.commit()
-    db.refresh(row)
+    await index_documents(
+        db, [exercise_list_doc(row.id, current_user.id, row.name, payload.items, row.created_at)]
+    )
+    await record_exercises(db, current_user.id, payload.items)
+    await db.commit()
+    await db.refresh(row)
     return ExerciseListSummary(id=row.id, name=row.name, created_at=row.created_at.isoformat())
 
 
 @router.get("", response_model=list[ExerciseListSummary])
-def list_exercise_lists(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    rows = (
-        db.query(ExerciseList)
-        .filter(ExerciseList.user_id == current_user.id)
-        .order_by(ExerciseList.created_at.desc())
-        .all()
+async def list_exercise_lists(
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=PAGE_SIZE_MAX),
+    cursor: Optional[str] = None,
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+):
+    stmt = select(ExerciseList.id, ExerciseList.name, ExerciseList.created_at).where(
+        ExerciseList.user_id == current_user.id
     )
+    rows, next_cursor = await keyset_page(db, stmt, ExerciseList, limit, cursor)
+    set_next_cursor(response, next_cursor)
     return [ExerciseListSummary(id=r.id, name=r.name, created_at=r.created_at.isoformat()) for r in rows]
 
 
 @router.get("/{list_id}", response_model=ExerciseListDetail)
-def get_exercise_list(
+async def get_exercise_list(
     list_id: str,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    r = (
-        db.query(ExerciseList)
-        .filter(ExerciseList.user_id == current_user.id, ExerciseList.id == list_id)
-        .first()
+    r = await db.scalar(
+        select(ExerciseList).where(ExerciseList.user_id == current_user.id, ExerciseList.id == list_id)
     )
     if not r:
         raise HTTPException(status_code=404, detail="Not found")
@@ -65,19 +81,18 @@ def get_exercise_list(
 
 
 @router.delete("/{list_id}", status_code=204)
-def delete_exercise_list(
+async def delete_exercise_list(
     list_id: str,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    r = (
-        db.query(ExerciseList)
-        .filter(ExerciseList.user_id == current_user.id, ExerciseList.id == list_id)
-        .first()
+    r = await db.scalar(
+        select(ExerciseList).where(ExerciseList.user_id == current_user.id, ExerciseList.id == list_id)
     )
     if not r:
         raise HTTPException(status_code=404, detail="Not found")
 
-    db.delete(r)
-    db.commit()
+    await remove_documents(db, "exercise_list", [r.id])
+    await db.delete(r)
+    await db.commit()
     return
@@ -0,0 +1,24 @@
+from fastapi import APIRouter, Depends, Query
+
+from auth import Principal, get_current_user
+from exercise_catalog import catalog_index
+from schemas import ExerciseSuggestion
+
+router = APIRouter(prefix="/api/exercises", tags=["exercises"])
+
+SUGGEST_LIMIT_DEFAULT = 10
+SUGGEST_LIMIT_MAX = 50
+
+
+# async so lookups run on the event loop, never concurrently with the index updates made by saves.
+@router.get("/suggest", response_model=list[ExerciseSuggestion])
+async def suggest_exercises(
+    q: str = Query(min_length=1, max_length=80),
+    limit: int = Query(SUGGEST_LIMIT_DEFAULT, ge=1, le=SUGGEST_LIMIT_MAX),
+    current_user: Principal = Depends(get_current_user),
+):
+    """Catalog names containing a word that starts with q; served from memory, no database access.
+
+    The catalog is shared, so only names saved by EXERCISE_SUGGEST_MIN_USERS distinct users are returned.
+    """
+    return [ExerciseSuggestion(name=name) for name in catalog_index.suggest(q, limit)]
@@ -0,0 +1,21 @@
+import hmac
+import os
+from typing import Optional
+
+from fastapi import APIRouter, Header, HTTPException
+from fastapi.responses import PlainTextResponse
+
+from core.metrics import registry
+
+router = APIRouter(tags=["metrics"])
+
+# Optional bearer token for the scrape endpoint; empty leaves it open (e.g. behind a private network).
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+
+@router.get("/metrics", include_in_schema=False)
+async def metrics(authorization: Optional[str] = Header(None)):
+    if METRICS_TOKEN and not hmac.compare_digest(authorization or "", f"Bearer {METRICS_TOKEN}"):
+        raise HTTPException(status_code=401, detail="Invalid token")
+    # Per process: with several workers, each one is scraped (or aggregated) separately.
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
@@ -0,0 +1,38 @@
+from typing import Literal, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from db import get_async_db
+from auth import Principal, get_current_user
+from pagination import PAGE_SIZE_DEFAULT, PAGE_SIZE_MAX, decode_offset_cursor, encode_offset_cursor, set_next_cursor
+from search import SEARCH_ENABLED, search
+from schemas import SearchResult
+
+router = APIRouter(prefix="/api/search", tags=["search"])
+
+
+@router.get("", response_model=list[SearchResult])
+async def search_library(
+    response: Response,
+    q: str = Query(min_length=1, max_length=200),
+    kind: Optional[Literal["workout", "exercise_list"]] = None,
+    limit: int = Query(PAGE_SIZE_DEFAULT, ge=1, le=PAGE_SIZE_MAX),
+    cursor: Optional[str] = None,
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Best matches first across saved workouts and exercise lists; the last word matches as a prefix."""
+    if not SEARCH_ENABLED:
+        raise HTTPException(
+            status_code=503,
+            detail={"code": "SEARCH_UNAVAILABLE", "message": "Search is not available on this database."},
+        )
+
+    offset = decode_offset_cursor(cursor) if cursor else 0
+    rows = await search(db, current_user.id, q, kind, limit + 1, offset)
+    set_next_cursor(response, encode_offset_cursor(offset + limit) if len(rows) > limit else None)
+    return [
+        SearchResult(kind=r.kind, id=r.item_id, title=r.title, created_at=r.created_at.isoformat())
+        for r in rows[:limit]
+    ]
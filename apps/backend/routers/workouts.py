@@ -1,113 +1,389 @@
 import json
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from pydantic import TypeAdapter
+from datetime import datetime
+from typing import AsyncIterator, Literal, Optional, Tuple
 
-from db import get_db
-from models import User, WorkoutProgram
-from auth import get_current_user
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from db import async_session, get_async_db
+from models import ExerciseList, ProgramBody, WorkoutProgram
+from auth import Principal, get_current_user
+from core.etag import etag_matches, strong_etag
+from core.zipstream import ZipStream
+from workout_store import create_workout, create_workouts, remove_workout, remove_workouts
+from search import retitle_document
+from workout_stats import STAT_COLUMNS, read_stats
+from pagination import PAGE_SIZE_MAX, keyset_page, set_next_cursor
 from schemas import (
     SaveWorkoutRequest,
     WorkoutSummary,
     WorkoutDetail,
     RenameWorkoutRequest,
-    ProgramResponse,
+    BatchSaveWorkoutsRequest,
+    BatchSaveWorkoutsResponse,
+    BatchItemResult,
+    BatchDeleteWorkoutsRequest,
+    BatchDeleteWorkoutsResponse,
+    ImportLineError,
+    WorkoutImportResponse,
+    WorkoutStatsResponse,
+    IntensityMix,
+    ExerciseFrequency,
+    WorkoutWeekAverage,
 )
 
 router = APIRouter(prefix="/api/workouts", tags=["workouts"])
 
+IMPORT_CHUNK_SIZE = 500
+IMPORT_MAX_LINE_BYTES = 1_000_000
+IMPORT_MAX_ERRORS = 100
+
+EXPORT_CHUNK_SIZE = 200
+
+
+def _validation_errors(e: ValidationError) -> list:
+    return e.errors(include_url=False, include_context=False, include_input=False)
+
+
+async def _ndjson_lines(request: Request) -> AsyncIterator[Tuple[int, bytes]]:
+    buffer = b""
+    line_no = 0
+    async for data in request.stream():
+        buffer += data
+        *lines, buffer = buffer.split(b"\n")
+        if len(buffer) > IMPORT_MAX_LINE_BYTES:
+            raise HTTPException(
+                status_code=413,
+                detail={"code": "LINE_TOO_LONG", "message": f"Line {line_no + len(lines) + 1} is too long."},
+            )
+        for line in lines:
+            line_no += 1
+            yield line_no, line
+    if buffer:
+        yield line_no + 1, buffer
+
+
+def _detail_json(
+    workout_id: str,
+    title: str,
+    input_text: Optional[str],
+    preferences_json: Optional[str],
+    program_text: str,
+    created_at: datetime,
+    prefix: str = "{",
+) -> str:
+    # Stored JSON was validated on save; splice it into the body instead of parsing and re-serializing it.
+    return "".join(
+        (
+            prefix, '"id":', json.dumps(workout_id),
+            ',"title":', json.dumps(title, ensure_ascii=False),
+            ',"input_text":', json.dumps(input_text, ensure_ascii=False),
+            ',"preferences":', preferences_json or "null",
+            ',"program":', program_text,
+            ',"created_at":', json.dumps(created_at.isoformat()),
+            "}",
+        )
+    )
+
+
+def _exercise_list_json(list_id: str, name: str, items_json: str, created_at: datetime, prefix: str = "{") -> str:
+    return "".join(
+        (
+            prefix, '"id":', json.dumps(list_id),
+            ',"name":', json.dumps(name, ensure_ascii=False),
+            ',"items":', items_json,
+            ',"created_at":', json.dumps(created_at.isoformat()),
+            "}",
+        )
+    )
+
+
+async def _export_rows(user_id: str, include_lists: bool) -> AsyncIterator[Tuple[str, list]]:
+    """(kind, rows) partitions of the user's library, oldest first, streamed with yield_per."""
+    workouts = (
+        select(
+            WorkoutProgram.id,
+            WorkoutProgram.title,
+            WorkoutProgram.input_text,
+            WorkoutProgram.preferences_json,
+            WorkoutProgram.program_json,
+            ProgramBody.body,
+            WorkoutProgram.created_at,
+        )
+        .outerjoin(ProgramBody, ProgramBody.hash == WorkoutProgram.program_hash)
+        .where(WorkoutProgram.user_id == user_id)
+        .order_by(WorkoutProgram.created_at, WorkoutProgram.id)
+    )
+    lists = (
+        select(ExerciseList.id, ExerciseList.name, ExerciseList.items_json, ExerciseList.created_at)
+        .where(ExerciseList.user_id == user_id)
+        .order_by(ExerciseList.created_at, ExerciseList.id)
+    )
+    queries = [("workout", workouts)] + ([("exercise_list", lists)] if include_lists else [])
+
+    # Own session: the response body is produced after the request's dependencies have been torn down.
+    async with async_session() as db:
+        for kind, stmt in queries:
+            # Plain column rows never enter the identity map, so memory is bounded by one partition.
+            result = await db.stream(stmt.execution_options(yield_per=EXPORT_CHUNK_SIZE))
+            try:
+                async for rows in result.partitions():
+                    yield kind, rows
+            finally:
+                await result.close()
+
+
+async def _export_ndjson(user_id: str, include_lists: bool) -> AsyncIterator[bytes]:
+    async for kind, rows in _export_rows(user_id, include_lists):
+        if kind == "workout":
+            lines = [
+                _detail_json(
+                    r.id, r.title, r.input_text, r.preferences_json, r.body or r.program_json, r.created_at,
+                    prefix='{"type":"workout",',
+                )
+                for r in rows
+            ]
+        else:
+            lines = [
+                _exercise_list_json(r.id, r.name, r.items_json, r.created_at, prefix='{"type":"exercise_list",')
+                for r in rows
+            ]
+        yield ("\n".join(lines) + "\n").encode()
+
+
+async def _export_zip(user_id: str, include_lists: bool) -> AsyncIterator[bytes]:
+    archive = ZipStream()
+    async for kind, rows in _export_rows(user_id, include_lists):
+        for r in rows:
+            if kind == "workout":
+                body = _detail_json(
+                    r.id, r.title, r.input_text, r.preferences_json, r.body or r.program_json, r.created_at
+                )
+                archive.add(f"workouts/{r.id}.json", body.encode(), r.created_at)
+            else:
+                body = _exercise_list_json(r.id, r.name, r.items_json, r.created_at)
+                archive.add(f"exercise-lists/{r.id}.json", body.encode(), r.created_at)
+        yield archive.drain()
+    yield archive.close()
+
+
+async def _owned_workout(db: AsyncSession, user_id: str, workout_id: str) -> WorkoutProgram:
+    r = await db.scalar(
+        select(WorkoutProgram).where(WorkoutProgram.user_id == user_id, WorkoutProgram.id == workout_id)
+    )
+    if not r:
+        raise HTTPException(status_code=404, detail="Not found")
+    return r
+
 
 @router.post("", response_model=WorkoutSummary)
-def save_workout(
+async def save_workout(
     payload: SaveWorkoutRequest,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    row = WorkoutProgram(
+    row = await create_workout(
+        db,
         user_id=current_user.id,
         title=payload.title,
         input_text=payload.input_text,
-        preferences_json=json.dumps(payload.preferences.model_dump() if payload.preferences else None),
-        program_json=json.dumps(payload.program.model_dump()),
+        preferences=payload.preferences.model_dump() if payload.preferences else None,
+        program=payload.program,
     )
-    db.add(row)
-    db.commit()
-    db.refresh(row)
+    await db.commit()
+    await db.refresh(row)
     return WorkoutSummary(id=row.id, title=row.title, created_at=row.created_at.isoformat())
 
 
 @router.get("", response_model=list[WorkoutSummary])
-def list_workouts(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    rows = (
-        db.query(WorkoutProgram)
-        .filter(WorkoutProgram.user_id == current_user.id)
-        .order_by(WorkoutProgram.created_at.desc())
-        .all()
+async def list_workouts(
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=PAGE_SIZE_MAX),
+    cursor: Optional[str] = None,
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+):
+    # Summary columns only, so the index covers the query and program_json is never read.
+    stmt = select(WorkoutProgram.id, WorkoutProgram.title, WorkoutProgram.created_at).where(
+        WorkoutProgram.user_id == current_user.id
     )
+    rows, next_cursor = await keyset_page(db, stmt, WorkoutProgram, limit, cursor)
+    set_next_cursor(response, next_cursor)
     return [WorkoutSummary(id=r.id, title=r.title, created_at=r.created_at.isoformat()) for r in rows]
 
 
+# Declared before the /{workout_id} routes so "batch", "import", "export" and "stats" are not taken for ids.
+@router.post("/batch", response_model=BatchSaveWorkoutsResponse)
+async def save_workouts_batch(
+    payload: BatchSaveWorkoutsRequest,
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+):
+    results = []
+    valid = []
+    for index, raw in enumerate(payload.items):
+        try:
+            valid.append((index, SaveWorkoutRequest.model_validate(raw)))
+        except ValidationError as e:
+            results.append(BatchItemResult(index=index, errors=_validation_errors(e)))
+
+    rows = await create_workouts(db, current_user.id, [item for _, item in valid]) if valid else []
+    await db.commit()
+
+    for (index, _), row in zip(valid, rows):
+        results.append(BatchItemResult(index=index, id=row.id, created_at=row.created_at.isoformat()))
+    results.sort(key=lambda r: r.index)
+    return BatchSaveWorkoutsResponse(saved=len(rows), failed=len(payload.items) - len(rows), results=results)
+
+
+@router.delete("/batch", response_model=BatchDeleteWorkoutsResponse)
+async def delete_workouts_batch(
+    payload: BatchDeleteWorkoutsRequest,
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+):
+    ids = list(dict.fromkeys(payload.ids))
+    removed = set(await remove_workouts(db, current_user.id, ids))
+    await db.commit()
+    return BatchDeleteWorkoutsResponse(deleted=len(removed), not_found=[i for i in ids if i not in removed])
+
+
+@router.post("/import", response_model=WorkoutImportResponse)
+async def import_workouts(
+    request: Request,
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """NDJSON body, one SaveWorkoutRequest per line; committed every IMPORT_CHUNK_SIZE rows."""
+    imported = 0
+    failed = 0
+    errors = []
+    chunk = []
+
+    async for line_no, line in _ndjson_lines(request):
+        if not line.strip():
+            continue
+        try:
+            chunk.append(SaveWorkoutRequest.model_validate_json(line))
+        except ValidationError as e:
+            failed += 1
+            if len(errors) < IMPORT_MAX_ERRORS:
+                errors.append(ImportLineError(line=line_no, errors=_validation_errors(e)))
+            continue
+
+        if len(chunk) >= IMPORT_CHUNK_SIZE:
+            await create_workouts(db, current_user.id, chunk)
+            await db.commit()
+            # Committed rows are not needed again; keep the identity map from growing with the import.
+            db.expunge_all()
+            imported += len(chunk)
+            chunk = []
+
+    if chunk:
+        await create_workouts(db, current_user.id, chunk)
+        await db.commit()
+        imported += len(chunk)
+
+    return WorkoutImportResponse(imported=imported, failed=failed, errors=errors)
+
+
+@router.get("/export")
+async def export_workouts(
+    format: Literal["ndjson", "zip"] = "ndjson",
+    include_lists: bool = False,
+    current_user: Principal = Depends(get_current_user),
+):
+    """The whole library in one download: NDJSON lines tagged with "type", or a ZIP of one JSON file per item."""
+    stamp = datetime.utcnow().strftime("%Y%m%d")
+    if format == "zip":
+        body, media_type = _export_zip(current_user.id, include_lists), "application/zip"
+    else:
+        body, media_type = _export_ndjson(current_user.id, include_lists), "application/x-ndjson"
+    headers = {
+        "Content-Disposition": f'attachment; filename="workouts-{stamp}.{format}"',
+        "Cache-Control": "private, no-store",
+    }
+    return StreamingResponse(body, media_type=media_type, headers=headers)
+
+
+@router.get("/stats", response_model=WorkoutStatsResponse)
+async def workout_stats(
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Totals over the user's saved programs, read from the incrementally maintained aggregates."""
+    totals, top = await read_stats(db, current_user.id)
+    t = {c: getattr(totals, c) if totals else 0 for c in STAT_COLUMNS}
+    weeks = t["programs"] or 1
+    return WorkoutStatsResponse(
+        programs=t["programs"],
+        sessions=t["sessions"],
+        sets=t["sets"],
+        minutes=t["minutes"],
+        calories=t["calories"],
+        intensity=IntensityMix(low=t["low_days"], medium=t["medium_days"], high=t["high_days"]),
+        top_exercises=[ExerciseFrequency(name=r.name, count=r.count) for r in top],
+        per_week=WorkoutWeekAverage(
+            sessions=round(t["sessions"] / weeks, 1),
+            sets=round(t["sets"] / weeks, 1),
+            minutes=round(t["minutes"] / weeks, 1),
+            calories=round(t["calories"] / weeks, 1),
+        ),
+    )
+
+
 @router.get("/{workout_id}", response_model=WorkoutDetail)
-def get_workout(
+async def get_workout(
     workout_id: str,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    if_none_match: Optional[str] = Header(None),
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    r = (
-        db.query(WorkoutProgram)
-        .filter(WorkoutProgram.user_id == current_user.id, WorkoutProgram.id == workout_id)
-        .first()
-    )
-    if not r:
+    owned = WorkoutProgram.user_id == current_user.id, WorkoutProgram.id == workout_id
+
+    version = await db.scalar(select(WorkoutProgram.version).where(*owned))
+    if version is None:
         raise HTTPException(status_code=404, detail="Not found")
 
-    prefs = json.loads(r.preferences_json) if r.preferences_json else None
-    program = TypeAdapter(ProgramResponse).validate_python(json.loads(r.program_json))
+    # The program body never changes after save and renames bump the version, so (id, version) is a strong validator.
+    etag = strong_etag(workout_id, version)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
 
-    return WorkoutDetail(
-        id=r.id,
-        title=r.title,
-        input_text=r.input_text,
-        preferences=prefs,
-        program=program,
-        created_at=r.created_at.isoformat(),
-    )
+    r = await _owned_workout(db, current_user.id, workout_id)
+
+    body = _detail_json(r.id, r.title, r.input_text, r.preferences_json, r.program_text, r.created_at)
+    headers["ETag"] = strong_etag(r.id, r.version)
+    return Response(content=body.encode(), media_type="application/json", headers=headers)
 
 
 @router.put("/{workout_id}", response_model=WorkoutSummary)
-def rename_workout(
+async def rename_workout(
     workout_id: str,
     payload: RenameWorkoutRequest,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    r = (
-        db.query(WorkoutProgram)
-        .filter(WorkoutProgram.user_id == current_user.id, WorkoutProgram.id == workout_id)
-        .first()
-    )
-    if not r:
-        raise HTTPException(status_code=404, detail="Not found")
+    r = await _owned_workout(db, current_user.id, workout_id)
 
     r.title = payload.title
-    db.commit()
+    await retitle_document(db, "workout", r.id, r.title)
+    await db.commit()
     return WorkoutSummary(id=r.id, title=r.title, created_at=r.created_at.isoformat())
 
 
 @router.delete("/{workout_id}", status_code=204)
-def delete_workout(
+async def delete_workout(
     workout_id: str,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    r = (
-        db.query(WorkoutProgram)
-        .filter(WorkoutProgram.user_id == current_user.id, WorkoutProgram.id == workout_id)
-        .first()
-    )
-    if not r:
-        raise HTTPException(status_code=404, detail="Not found")
+    r = await _owned_workout(db, current_user.id, workout_id)
 
-    db.delete(r)
-    db.commit()
+    await remove_workout(db, r)
+    await db.commit()
     return
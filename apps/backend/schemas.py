@@ -1,5 +1,5 @@
 from pydantic import BaseModel, EmailStr, Field
-from typing import List, Literal, Optional, Union
+from typing import Any, Dict, List, Literal, Optional, Union
 
 # -------- AUTH --------
 
@@ -62,6 +62,24 @@ class ProgramPreferences(BaseModel):
 class AIProgramRequest(BaseModel):
     text: str = Field(min_length=1, max_length=4000)
     preferences: Optional[ProgramPreferences] = None
+    fresh: bool = False
+
+class AIJobRequest(AIProgramRequest):
+    auto_save: bool = False
+    title: Optional[str] = Field(default=None, min_length=1, max_length=80)
+
+class AIJobSubmitted(BaseModel):
+    id: str
+    status: str
+
+class AIJobStatus(BaseModel):
+    id: str
+    status: Literal["queued", "running", "done", "failed"]
+    result: Optional[ProgramResponse] = None
+    error: Optional[dict] = None
+    workout_id: Optional[str] = None
+    created_at: str
+    finished_at: Optional[str] = None
 
 class SaveWorkoutRequest(BaseModel):
     title: str = Field(min_length=1, max_length=80)
@@ -82,9 +100,66 @@ class WorkoutDetail(BaseModel):
     program: ProgramResponse
     created_at: str
 
+class IntensityMix(BaseModel):
+    low: int
+    medium: int
+    high: int
+
+class ExerciseFrequency(BaseModel):
+    name: str
+    count: int
+
+class WorkoutWeekAverage(BaseModel):
+    sessions: float
+    sets: float
+    minutes: float
+    calories: float
+
+class WorkoutStatsResponse(BaseModel):
+    programs: int
+    sessions: int
+    sets: int
+    minutes: int
+    calories: int
+    intensity: IntensityMix
+    top_exercises: List[ExerciseFrequency]
+    # Each saved program is one week's plan, so per-program averages are weekly totals.
+    per_week: WorkoutWeekAverage
+
 class RenameWorkoutRequest(BaseModel):
     title: str = Field(min_length=1, max_length=80)
 
+# Items stay untyped here so one bad item is reported in its result instead of failing the whole batch.
+class BatchSaveWorkoutsRequest(BaseModel):
+    items: List[Any] = Field(min_length=1, max_length=1000)
+
+class BatchItemResult(BaseModel):
+    index: int
+    id: Optional[str] = None
+    created_at: Optional[str] = None
+    errors: Optional[List[dict]] = None
+
+class BatchSaveWorkoutsResponse(BaseModel):
+    saved: int
+    failed: int
+    results: List[BatchItemResult]
+
+class BatchDeleteWorkoutsRequest(BaseModel):
+    ids: List[str] = Field(min_length=1, max_length=1000)
+
+class BatchDeleteWorkoutsResponse(BaseModel):
+    deleted: int
+    not_found: List[str]
+
+class ImportLineError(BaseModel):
+    line: int
+    errors: List[dict]
+
+class WorkoutImportResponse(BaseModel):
+    imported: int
+    failed: int
+    errors: List[ImportLineError]
+
 class CreateExerciseListRequest(BaseModel):
     name: str = Field(min_length=1, max_length=80)
     items: List[str] = Field(min_length=1, max_length=200)
@@ -98,4 +173,33 @@ class ExerciseListDetail(BaseModel):
     id: str
     name: str
     items: List[str]
-    created_at: str
\ No newline at end of file
+    created_at: str
+
+class ExerciseSuggestion(BaseModel):
+    name: str
+
+# -------- SEARCH --------
+
+class SearchResult(BaseModel):
+    kind: Literal["workout", "exercise_list"]
+    id: str
+    title: str
+    created_at: str
+
+# -------- ADMIN --------
+
+class AIUsageSummary(BaseModel):
+    user_id: Optional[str] = None
+    email: Optional[str] = None
+    calls: int
+    input_tokens: int
+    output_tokens: int
+    cost_usd: float
+    avg_latency_ms: int
+    outcomes: Dict[str, int]
+
+class AIUsageReport(BaseModel):
+    since: str
+    tokens_per_day: float
+    totals: AIUsageSummary
+    users: List[AIUsageSummary]
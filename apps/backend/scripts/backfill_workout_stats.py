@@ -0,0 +1,64 @@
+import argparse
+import asyncio
+from collections import defaultdict
+
+from sqlalchemy import delete, select, update
+
+from db import Base, async_session, engine
+from migrations import run_migrations
+from models import ProgramBody, User, WorkoutExerciseCount, WorkoutProgram, WorkoutStats
+from workout_stats import StatsDelta, apply_stats
+
+
+async def _backfill(batch: int) -> None:
+    last_user = ""
+    users_done = programs_done = 0
+    while True:
+        async with async_session() as db:
+            # Every user, so stale totals of users with no workouts left are cleared too.
+            users = (
+                await db.scalars(select(User.id).where(User.id > last_user).order_by(User.id).limit(batch))
+            ).all()
+            if not users:
+                break
+
+            # Clearing first takes the write lock, so saves by these users wait until their totals are rebuilt.
+            await db.execute(delete(WorkoutStats).where(WorkoutStats.user_id.in_(users)))
+            await db.execute(delete(WorkoutExerciseCount).where(WorkoutExerciseCount.user_id.in_(users)))
+            # From here on saves and deletes keep the rebuilt totals up to date.
+            await db.execute(update(User).where(User.id.in_(users)).values(stats_backfilled=True))
+
+            rows = (
+                await db.execute(
+                    select(WorkoutProgram.user_id, WorkoutProgram.program_json, ProgramBody.body)
+                    .outerjoin(ProgramBody, ProgramBody.hash == WorkoutProgram.program_hash)
+                    .where(WorkoutProgram.user_id.in_(users))
+                )
+            ).all()
+            deltas = defaultdict(StatsDelta)
+            for r in rows:
+                deltas[r.user_id].add_program(r.body or r.program_json)
+            for user_id, delta in deltas.items():
+                await apply_stats(db, user_id, delta)
+            await db.commit()
+
+        last_user = users[-1]
+        users_done += len(users)
+        programs_done += len(rows)
+        print(f"{users_done} users, {programs_done} programs", end="\r")
+    print(f"{users_done} users, {programs_done} programs")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Recompute the per-user workout aggregates from saved programs.")
+    parser.add_argument("--batch", type=int, default=100, help="users per transaction")
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
+
+    asyncio.run(_backfill(args.batch))
+
+
+if __name__ == "__main__":
+    main()
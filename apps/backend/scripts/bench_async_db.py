@@ -0,0 +1,26 @@
+import argparse
+import os
+import subprocess
+import sys
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run the router load test with the async and the sync DB stack.")
+    parser.add_argument("-c", "--concurrency", type=int, default=32)
+    parser.add_argument("-s", "--seconds", type=float, default=10)
+    args = parser.parse_args()
+
+    # Separate processes: the DB stack is chosen at import time, and each run gets a fresh database.
+    for label, flag in (("async (aiosqlite)", "1"), ("sync (threadpool)", "0")):
+        print(f"== {label}")
+        env = {**os.environ, "DB_ASYNC": flag}
+        env.pop("DATABASE_URL", None)
+        subprocess.run(
+            [sys.executable, "-m", "scripts.bench_db_concurrency", "-c", str(args.concurrency), "-s", str(args.seconds)],
+            env=env,
+            check=True,
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import tempfile
+from collections import defaultdict
+from time import perf_counter
+
+import httpx
+
+PROGRAM = {
+    "status": "ok",
+    "days": [
+        {
+            "day": 1,
+            "focus": "Full body",
+            "intensity": "medium",
+            "duration_minutes": 45,
+            "equipment": ["dumbbells"],
+            "warmup": ["Arm circles", "Leg swings"],
+            "exercises": [{"name": "Goblet squat", "sets": 3, "reps": "10-12", "rest_seconds": 60}],
+            "cooldown": ["Hamstring stretch"],
+            "estimated_calories": 300,
+        }
+    ],
+}
+
+# Roughly what the dashboard does: mostly listing and opening programs, some saves and renames.
+MIX = [("list", 50), ("detail", 30), ("save", 15), ("rename", 5)]
+
+
+async def _login(client: httpx.AsyncClient, i: int) -> dict:
+    creds = {"email": f"bench{i}@example.com", "password": "bench-password"}
+    await client.post("/api/auth/signup", json=creds)
+    token = (await client.post("/api/auth/login", json=creds)).json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+
+async def _worker(client, headers, deadline, results, rng) -> None:
+    ids = []
+    ops, weights = zip(*MIX)
+    while perf_counter() < deadline:
+        op = rng.choices(ops, weights)[0]
+        if op in ("detail", "rename") and not ids:
+            op = "save"
+
+        started = perf_counter()
+        if op == "list":
+            r = await client.get("/api/workouts", headers=headers)
+        elif op == "detail":
+            r = await client.get(f"/api/workouts/{rng.choice(ids)}", headers=headers)
+        elif op == "save":
+            r = await client.post("/api/workouts", json={"title": "Bench", "program": PROGRAM}, headers=headers)
+            if r.status_code == 200:
+                ids.append(r.json()["id"])
+        else:
+            r = await client.put(f"/api/workouts/{rng.choice(ids)}", json={"title": "Renamed"}, headers=headers)
+        results[op].append((perf_counter() - started, r.status_code))
+
+
+def _report(results, elapsed: float) -> None:
+    total = sum(len(v) for v in results.values())
+    errors = sum(1 for v in results.values() for _, status in v if status >= 500)
+    print(f"{total / elapsed:.0f} req/s over {elapsed:.1f}s, {errors} server errors")
+    for op, samples in sorted(results.items()):
+        latencies = sorted(s for s, _ in samples)
+        q = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+        failed = sum(1 for _, status in samples if status >= 400)
+        print(
+            f"  {op:<7} n={len(samples):<6} p50 {q[49] * 1000:7.1f} ms  p95 {q[94] * 1000:7.1f} ms  "
+            f"p99 {q[98] * 1000:7.1f} ms  failed {failed}"
+        )
+
+
+async def run(args) -> None:
+    if args.url:
+        transport, base_url = None, args.url
+    else:
+        import main
+
+        transport, base_url = httpx.ASGITransport(app=main.app, raise_app_exceptions=False), "http://bench"
+
+    limits = httpx.Limits(max_connections=args.concurrency)
+    async with httpx.AsyncClient(transport=transport, base_url=base_url, limits=limits, timeout=60) as client:
+        users = [await _login(client, i) for i in range(args.users)]
+        results = defaultdict(list)
+        rng = random.Random(7)
+
+        started = perf_counter()
+        deadline = started + args.seconds
+        await asyncio.gather(
+            *(
+                _worker(client, users[i % len(users)], deadline, results, random.Random(rng.random()))
+                for i in range(args.concurrency)
+            )
+        )
+        _report(results, perf_counter() - started)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Mixed read/write load against the workout routers.")
+    parser.add_argument("--url", help="target a running server (e.g. several uvicorn workers) instead of in-process")
+    parser.add_argument("-c", "--concurrency", type=int, default=32)
+    parser.add_argument("-u", "--users", type=int, default=8)
+    parser.add_argument("-s", "--seconds", type=float, default=10)
+    args = parser.parse_args()
+
+    if not args.url:
+        # Fresh database per run; compare against SQLITE_TUNING=0 SQLITE_SERIALIZE_WRITES=0 for the baseline.
+        workdir = tempfile.mkdtemp()
+        os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(workdir, 'bench.db')}")
+        os.environ.setdefault("BCRYPT_ROUNDS", "4")
+
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
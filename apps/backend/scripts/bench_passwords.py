@@ -0,0 +1,44 @@
+import argparse
+import asyncio
+import os
+from time import perf_counter
+
+import passwords
+from passwords import BCRYPT_ROUNDS, hash_password, verify_and_update, verify_and_update_async
+
+
+def bench_sync(password_hash: str, n: int) -> float:
+    started = perf_counter()
+    for _ in range(n):
+        verify_and_update("correct horse", password_hash)
+    return n / (perf_counter() - started)
+
+
+async def bench_pool(password_hash: str, n: int) -> float:
+    await verify_and_update_async("correct horse", password_hash)  # spin the workers up
+
+    started = perf_counter()
+    await asyncio.gather(*(verify_and_update_async("correct horse", password_hash) for _ in range(n)))
+    return n / (perf_counter() - started)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare login throughput with inline vs pooled bcrypt.")
+    parser.add_argument("-n", "--logins", type=int, default=64)
+    args = parser.parse_args()
+
+    password_hash = hash_password("correct horse")
+    cores = os.cpu_count() or 1
+
+    inline = bench_sync(password_hash, args.logins)
+    pooled = asyncio.run(bench_pool(password_hash, args.logins))
+    passwords.shutdown()
+
+    print(f"bcrypt rounds:  {BCRYPT_ROUNDS}")
+    print(f"workers:        {passwords.PASSWORD_HASH_WORKERS} ({cores} cores)")
+    print(f"inline:         {inline:.1f} logins/s ({inline / cores:.1f} per core)")
+    print(f"process pool:   {pooled:.1f} logins/s ({pooled / cores:.1f} per core)")
+
+
+if __name__ == "__main__":
+    main()
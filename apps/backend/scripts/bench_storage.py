@@ -0,0 +1,106 @@
+import argparse
+import json
+import os
+import random
+import tempfile
+from time import perf_counter
+
+import zstandard
+from sqlalchemy import Column, MetaData, String, Table, Text, create_engine, insert, select
+
+import compact_json
+from compact_json import CompactJSON
+from models import CompressionDictionary
+
+EXERCISES = [
+    "Squat", "Goblet squat", "Push-ups", "Incline push-ups", "Plank", "Side plank", "Lunges", "Reverse lunges",
+    "Glute bridge", "Dumbbell row", "Overhead press", "Romanian deadlift", "Burpees", "Mountain climbers",
+    "Jumping jacks", "Bicycle crunches", "Pull-ups", "Dips", "Calf raises", "Russian twists",
+]
+FOCUS = ["Full body", "Upper body", "Lower body", "Core", "Cardio", "Mobility"]
+WARMUP = ["5 min brisk walk", "Arm circles", "Leg swings", "Hip openers", "Jumping jacks"]
+COOLDOWN = ["Hamstring stretch", "Quad stretch", "Child's pose", "Deep breathing"]
+
+
+def fake_program(rng: random.Random) -> str:
+    days = []
+    for day in range(1, rng.randint(2, 6) + 1):
+        days.append(
+            {
+                "day": day,
+                "focus": rng.choice(FOCUS),
+                "intensity": rng.choice(["low", "medium", "high"]),
+                "duration_minutes": rng.choice([20, 30, 45, 60]),
+                "equipment": rng.sample(["dumbbells", "mat", "bench", "band"], rng.randint(0, 2)),
+                "warmup": rng.sample(WARMUP, 2),
+                "exercises": [
+                    {
+                        "name": name,
+                        "sets": rng.randint(2, 5),
+                        "reps": rng.choice(["8-10", "10-12", "12", "30 seconds", "45 seconds"]),
+                        "rest_seconds": rng.choice([30, 45, 60, 90]),
+                    }
+                    for name in rng.sample(EXERCISES, rng.randint(4, 7))
+                ],
+                "cooldown": rng.sample(COOLDOWN, 2),
+                "estimated_calories": rng.randint(150, 500),
+            }
+        )
+    return json.dumps({"status": "ok", "days": days})
+
+
+def bench(label: str, column_type, bodies, reads: int, workdir: str) -> None:
+    path = os.path.join(workdir, f"{label}.db")
+    engine = create_engine(f"sqlite:///{path}")
+    metadata = MetaData()
+    table = Table("programs", metadata, Column("id", String, primary_key=True), Column("body", column_type))
+    metadata.create_all(engine)
+
+    started = perf_counter()
+    with engine.begin() as conn:
+        conn.execute(insert(table), [{"id": str(i), "body": b} for i, b in enumerate(bodies)])
+    write_s = perf_counter() - started
+
+    ids = [str(random.randrange(len(bodies))) for _ in range(reads)]
+    started = perf_counter()
+    with engine.connect() as conn:
+        for row_id in ids:
+            conn.execute(select(table.c.body).where(table.c.id == row_id)).scalar_one()
+    read_s = perf_counter() - started
+    engine.dispose()
+
+    size = os.path.getsize(path)
+    print(
+        f"{label:<10} size {size / 1024:9.0f} KiB   "
+        f"write {write_s / len(bodies) * 1e6:7.1f} us/row   read {read_s / reads * 1e6:7.1f} us/row"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare DB size and latency of plain vs compact JSON storage.")
+    parser.add_argument("-n", "--rows", type=int, default=5000)
+    parser.add_argument("--reads", type=int, default=5000)
+    parser.add_argument("--dict-size", type=int, default=32 * 1024)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    bodies = [fake_program(rng) for _ in range(args.rows)]
+    print(f"{args.rows} programs, {sum(map(len, bodies)) / len(bodies):.0f} bytes of JSON on average")
+
+    with tempfile.TemporaryDirectory() as workdir:
+        dict_engine = create_engine(f"sqlite:///{os.path.join(workdir, 'dicts.db')}")
+        CompressionDictionary.__table__.create(dict_engine)
+
+        compact_json.load_dictionaries(dict_engine)
+        bench("json", Text, bodies, args.reads, workdir)
+        bench("zstd", CompactJSON, bodies, args.reads, workdir)
+
+        trained = zstandard.train_dictionary(args.dict_size, [b.encode() for b in bodies[:2000]])
+        with dict_engine.begin() as conn:
+            conn.execute(insert(CompressionDictionary.__table__), {"data": trained.as_bytes(), "samples": 2000})
+        compact_json.load_dictionaries(dict_engine)
+        bench("zstd+dict", CompactJSON, bodies, args.reads, workdir)
+
+
+if __name__ == "__main__":
+    main()
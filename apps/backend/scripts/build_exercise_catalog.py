@@ -0,0 +1,76 @@
+import argparse
+import asyncio
+import json
+from collections import Counter, defaultdict
+
+from sqlalchemy import delete, func, literal, select
+
+from db import Base, async_session, engine
+from exercise_catalog import record_exercise_counts
+from migrations import run_migrations
+from models import CatalogExercise, CatalogExerciseUser, ExerciseList, ProgramBody, WorkoutProgram
+
+
+def _program_names(row):
+    for day in json.loads(row.body).get("days") or []:
+        for exercise in day.get("exercises") or []:
+            yield exercise.get("name") or ""
+
+
+def _list_names(row):
+    return json.loads(row.body)
+
+
+async def _count(db, stmt, names_of, batch: int, counts) -> None:
+    result = await db.stream(stmt.execution_options(yield_per=batch))
+    async for rows in result.partitions():
+        for row in rows:
+            for name in names_of(row):
+                counts[row.user_id][name] += row.weight
+    await result.close()
+
+
+async def _build(batch: int) -> None:
+    counts = defaultdict(Counter)
+    async with async_session() as db:
+        # Counted per user, so the catalog knows how many distinct users saved each name. A shared body is
+        # read once per user and weighted by how many of that user's programs reference it.
+        shared = (
+            select(WorkoutProgram.user_id, ProgramBody.body, func.count().label("weight"))
+            .join(ProgramBody, ProgramBody.hash == WorkoutProgram.program_hash)
+            .group_by(WorkoutProgram.user_id, ProgramBody.hash, ProgramBody.body)
+        )
+        await _count(db, shared, _program_names, batch, counts)
+        inline = select(
+            WorkoutProgram.user_id, WorkoutProgram.program_json.label("body"), literal(1).label("weight")
+        ).where(WorkoutProgram.program_json.is_not(None))
+        await _count(db, inline, _program_names, batch, counts)
+        lists = select(ExerciseList.user_id, ExerciseList.items_json.label("body"), literal(1).label("weight"))
+        await _count(db, lists, _list_names, batch, counts)
+
+        await db.execute(delete(CatalogExerciseUser))
+        await db.execute(delete(CatalogExercise))
+        for user_id, user_counts in counts.items():
+            names = list(user_counts.items())
+            for start in range(0, len(names), batch):
+                await record_exercise_counts(db, user_id, dict(names[start:start + batch]))
+        await db.commit()
+
+        entries = await db.scalar(select(func.count()).select_from(CatalogExercise))
+    spellings = len({name for user_counts in counts.values() for name in user_counts})
+    print(f"{spellings} spellings from {len(counts)} users folded into {entries} catalog entries")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Rebuild the exercise catalog from saved programs and exercise lists.")
+    parser.add_argument("--batch", type=int, default=500)
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
+
+    asyncio.run(_build(args.batch))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+import argparse
+import random
+
+import zstandard
+from sqlalchemy import bindparam, text
+
+import compact_json
+from db import Base, SessionLocal, engine
+from migrations import run_migrations
+from models import CompressionDictionary, ExerciseList, ProgramBody, WorkoutProgram
+
+COLUMNS = [
+    (ProgramBody.__table__, "body"),
+    (WorkoutProgram.__table__, "program_json"),
+    (ExerciseList.__table__, "items_json"),
+]
+
+# zstd refuses to train on a handful of samples; below this, rows are compressed without a dictionary.
+MIN_TRAIN_SAMPLES = 64
+
+
+def train(dict_size: int, max_samples: int) -> None:
+    samples = []
+    with engine.connect() as conn:
+        for table, column in COLUMNS:
+            rows = conn.execute(text(f"SELECT {column} FROM {table.name} WHERE {column} IS NOT NULL ORDER BY RANDOM() LIMIT :n"), {"n": max_samples})
+            samples.extend(compact_json.decode(v).encode("utf-8") for (v,) in rows)
+
+    if len(samples) < MIN_TRAIN_SAMPLES:
+        print(f"only {len(samples)} samples, skipping dictionary training")
+        return
+
+    random.shuffle(samples)
+    trained = zstandard.train_dictionary(dict_size, samples)
+
+    db = SessionLocal()
+    try:
+        row = CompressionDictionary(data=trained.as_bytes(), samples=len(samples))
+        db.add(row)
+        db.commit()
+        print(f"trained dictionary {row.id}: {len(trained.as_bytes())} bytes from {len(samples)} samples")
+    finally:
+        db.close()
+
+    compact_json.load_dictionaries(engine)
+
+
+def _needs_rewrite(value, recompress: bool) -> bool:
+    if value is None:
+        return False
+    if not compact_json.is_compact(value):
+        return True
+    if not recompress:
+        return False
+    return compact_json.dictionary_id(value) != compact_json.active_dictionary_id()
+
+
+def rewrite(table, column: str, batch: int, recompress: bool) -> None:
+    key = table.primary_key.columns.values()[0].name
+    select = text(f"SELECT {key}, {column} FROM {table.name} WHERE {key} > :after ORDER BY {key} LIMIT :n")
+    # Core update: bypasses the ORM version counter, the decoded content (and so the ETag) is unchanged.
+    update = table.update().where(table.c[key] == bindparam("row_id")).values({column: bindparam("new_body")})
+
+    after, scanned, rewritten = "", 0, 0
+    while True:
+        with engine.begin() as conn:
+            rows = conn.execute(select, {"after": after, "n": batch}).all()
+            if not rows:
+                break
+            changes = [
+                {"row_id": row_id, "new_body": compact_json.decode(value)}
+                for row_id, value in rows
+                if _needs_rewrite(value, recompress)
+            ]
+            if changes:
+                conn.execute(update, changes)
+
+        after = rows[-1][0]
+        scanned += len(rows)
+        rewritten += len(changes)
+        print(f"{table.name}.{column}: {rewritten}/{scanned} rewritten", end="\r")
+    print(f"{table.name}.{column}: {rewritten}/{scanned} rewritten")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Rewrite stored program/list JSON into the compact zstd format.")
+    parser.add_argument("--batch", type=int, default=500)
+    parser.add_argument("--no-train", action="store_true", help="reuse the current dictionary")
+    parser.add_argument("--dict-size", type=int, default=32 * 1024)
+    parser.add_argument("--train-samples", type=int, default=2000)
+    parser.add_argument("--recompress", action="store_true", help="also rewrite rows compressed with an older dictionary")
+    parser.add_argument("--vacuum", action="store_true", help="VACUUM afterwards so the file actually shrinks")
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
+    compact_json.load_dictionaries(engine)
+
+    if not args.no_train:
+        train(args.dict_size, args.train_samples)
+
+    for table, column in COLUMNS:
+        rewrite(table, column, args.batch, args.recompress)
+
+    if args.vacuum:
+        with engine.connect() as conn:
+            conn.exec_driver_sql("VACUUM")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+import argparse
+import asyncio
+
+from pydantic import TypeAdapter
+from sqlalchemy import func, select, update
+
+from db import Base, async_session, engine
+from migrations import run_migrations
+from models import ProgramBody, WorkoutProgram
+from schemas import ProgramResponse
+from workout_store import acquire_body, program_body
+
+_program_adapter = TypeAdapter(ProgramResponse)
+
+
+async def _move(batch: int) -> None:
+    moved = 0
+    async with async_session() as db:
+        while True:
+            rows = (
+                await db.execute(
+                    select(WorkoutProgram.id, WorkoutProgram.program_json)
+                    .where(WorkoutProgram.program_hash.is_(None), WorkoutProgram.program_json.is_not(None))
+                    .order_by(WorkoutProgram.id)
+                    .limit(batch)
+                )
+            ).all()
+            if not rows:
+                break
+
+            for row_id, program_json in rows:
+                # Re-serialize through the model so legacy formatting hashes like a fresh save.
+                program_hash, body = program_body(_program_adapter.validate_json(program_json))
+                await acquire_body(db, program_hash, body)
+                # The re-serialized body is byte-for-byte different, so bump the version to change the strong ETag.
+                await db.execute(
+                    update(WorkoutProgram)
+                    .where(WorkoutProgram.id == row_id)
+                    .values(program_hash=program_hash, program_json=None, version=WorkoutProgram.version + 1)
+                    .execution_options(synchronize_session=False)
+                )
+            await db.commit()
+            moved += len(rows)
+            print(f"moved {moved} programs", end="\r")
+
+        bodies = await db.scalar(select(func.count()).select_from(ProgramBody))
+        refs = await db.scalar(select(func.coalesce(func.sum(ProgramBody.ref_count), 0)))
+    print(f"moved {moved} programs; {bodies} unique bodies for {refs} saved programs")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Move inline program_json bodies into the shared program_bodies table."
+    )
+    parser.add_argument("--batch", type=int, default=500)
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
+
+    asyncio.run(_move(args.batch))
+
+
+if __name__ == "__main__":
+    main()
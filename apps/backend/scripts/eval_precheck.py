@@ -0,0 +1,55 @@
+import argparse
+import json
+import sys
+from pathlib import Path
+
+from ai_precheck import AI_PRECHECK_THRESHOLD, classify
+
+CORPUS = Path(__file__).resolve().parent.parent / "data" / "precheck_corpus.jsonl"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Measure the AI precheck against the labeled corpus.")
+    parser.add_argument("--corpus", default=str(CORPUS))
+    parser.add_argument("--threshold", type=float, default=AI_PRECHECK_THRESHOLD)
+    parser.add_argument("-v", "--verbose", action="store_true", help="print every misclassified row")
+    args = parser.parse_args()
+
+    rows = [json.loads(line) for line in Path(args.corpus).read_text().splitlines() if line.strip()]
+
+    false_rejections = 0
+    must_pass_rejected = []
+    caught = 0
+    rejectable = 0
+    for row in rows:
+        label, confidence = classify(row["text"], row.get("preferences"))
+        predicted = label if label != "ok" and confidence >= args.threshold else "ok"
+
+        if row["label"] == "ok":
+            if predicted != "ok":
+                false_rejections += 1
+                if row.get("must_pass"):
+                    must_pass_rejected.append(row["text"])
+        else:
+            rejectable += 1
+            if predicted == row["label"]:
+                caught += 1
+
+        if args.verbose and predicted != row["label"]:
+            print(f"  expected={row['label']:<12} got={predicted:<12} conf={confidence:.2f}  {row['text']!r}")
+
+    accepted = len(rows) - rejectable
+    print(f"threshold:         {args.threshold}")
+    print(f"rows:              {len(rows)}")
+    print(f"false rejections:  {false_rejections}/{accepted}")
+    print(f"rejections caught: {caught}/{rejectable} (rest are left to the model)")
+
+    # must_pass rows are known past false rejections; any of them failing is a regression.
+    for text in must_pass_rejected:
+        print(f"  must-pass row rejected: {text!r}")
+    if must_pass_rejected:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
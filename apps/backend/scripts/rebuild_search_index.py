@@ -0,0 +1,77 @@
+import argparse
+import asyncio
+import json
+
+from sqlalchemy import delete, select, text
+
+from db import Base, async_session, engine
+from migrations import run_migrations
+from models import ExerciseList, ProgramBody, SearchDocument, WorkoutProgram
+from search import exercise_list_doc, index_documents, search_index, workout_doc
+
+
+async def _reindex(db, stmt, to_doc, batch: int, label: str) -> int:
+    indexed = 0
+    result = await db.stream(stmt.execution_options(yield_per=batch))
+    async for rows in result.partitions():
+        await index_documents(db, [to_doc(r) for r in rows])
+        indexed += len(rows)
+        print(f"indexed {indexed} {label}", end="\r")
+    await result.close()
+    print(f"indexed {indexed} {label}")
+    return indexed
+
+
+async def _rebuild(batch: int) -> None:
+    async with async_session() as db:
+        # One transaction: searches keep seeing the old index until the new one is complete.
+        await db.execute(delete(SearchDocument))
+        await db.execute(delete(search_index))
+
+        workouts = select(
+            WorkoutProgram.id,
+            WorkoutProgram.user_id,
+            WorkoutProgram.title,
+            WorkoutProgram.input_text,
+            WorkoutProgram.program_json,
+            ProgramBody.body,
+            WorkoutProgram.created_at,
+        ).outerjoin(ProgramBody, ProgramBody.hash == WorkoutProgram.program_hash)
+        await _reindex(
+            db,
+            workouts,
+            lambda r: workout_doc(r.id, r.user_id, r.title, r.input_text, r.body or r.program_json, r.created_at),
+            batch,
+            "workouts",
+        )
+
+        lists = select(
+            ExerciseList.id, ExerciseList.user_id, ExerciseList.name, ExerciseList.items_json, ExerciseList.created_at
+        )
+        await _reindex(
+            db,
+            lists,
+            lambda r: exercise_list_doc(r.id, r.user_id, r.name, json.loads(r.items_json), r.created_at),
+            batch,
+            "exercise lists",
+        )
+        await db.commit()
+
+        # Merge the b-tree segments written by the batches into one for faster queries.
+        await db.execute(text("INSERT INTO search_index(search_index) VALUES ('optimize')"))
+        await db.commit()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Rebuild the full-text search index from saved workouts and lists.")
+    parser.add_argument("--batch", type=int, default=500)
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
+
+    asyncio.run(_rebuild(args.batch))
+
+
+if __name__ == "__main__":
+    main()
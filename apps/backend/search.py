@@ -0,0 +1,162 @@
+import json
+import re
+from datetime import datetime
+from typing import Iterable, List, NamedTuple, Optional
+
+from sqlalchemy import Integer, String, bindparam, delete, func, insert, literal_column, select, text, update
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import column, table
+
+from db import DATABASE_URL
+from models import SearchDocument
+
+# FTS5 is SQLite-only; elsewhere indexing is skipped and the search endpoint reports itself unavailable.
+SEARCH_ENABLED = DATABASE_URL.startswith("sqlite")
+
+SEARCH_MAX_TERMS = 8
+
+# rowid matches SearchDocument.id. owner is the user id as a single token, so the MATCH
+# itself restricts results to one user instead of filtering every user's hits afterwards.
+search_index = table(
+    "search_index",
+    column("rowid", Integer),
+    column("title", String),
+    column("body", String),
+    column("owner", String),
+)
+
+_CREATE_INDEX = text(
+    "CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5("
+    "title, body, owner, tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+)
+
+# bm25 weights per column: title, body, owner.
+_rank = func.bm25(literal_column("search_index"), 4.0, 1.0, 0.0)
+
+
+class SearchDoc(NamedTuple):
+    kind: str
+    item_id: str
+    user_id: str
+    title: str
+    body: str
+    created_at: datetime
+
+
+def create_search_index(engine: Engine) -> None:
+    if engine.dialect.name != "sqlite":
+        return
+    with engine.begin() as conn:
+        conn.execute(_CREATE_INDEX)
+
+
+def _owner(user_id: str) -> str:
+    return user_id.replace("-", "")
+
+
+def program_terms(program_text: Optional[str]) -> List[str]:
+    """Day focus, equipment and exercise names of a stored program."""
+    if not program_text:
+        return []
+    terms = []
+    for day in json.loads(program_text).get("days") or []:
+        terms.append(day.get("focus") or "")
+        terms.extend(day.get("equipment") or [])
+        terms.extend(e.get("name") or "" for e in day.get("exercises") or [])
+    return terms
+
+
+def workout_doc(
+    item_id: str,
+    user_id: str,
+    title: str,
+    input_text: Optional[str],
+    program_text: Optional[str],
+    created_at: datetime,
+) -> SearchDoc:
+    body = "\n".join([input_text or "", *program_terms(program_text)])
+    return SearchDoc("workout", item_id, user_id, title, body, created_at)
+
+
+def exercise_list_doc(item_id: str, user_id: str, name: str, items: List[str], created_at: datetime) -> SearchDoc:
+    return SearchDoc("exercise_list", item_id, user_id, name, "\n".join(items), created_at)
+
+
+async def index_documents(db: AsyncSession, docs: List[SearchDoc]) -> None:
+    if not SEARCH_ENABLED or not docs:
+        return
+    # Matched back by item_id: asking for rows in parameter order makes SQLite insert them one at a time.
+    rowids = dict(
+        (
+            await db.execute(
+                insert(SearchDocument).returning(SearchDocument.item_id, SearchDocument.id),
+                [{"kind": d.kind, "item_id": d.item_id, "created_at": d.created_at} for d in docs],
+            )
+        ).all()
+    )
+    await db.execute(
+        insert(search_index),
+        [
+            {"rowid": rowids[d.item_id], "title": d.title, "body": d.body, "owner": _owner(d.user_id)}
+            for d in docs
+        ],
+    )
+
+
+async def remove_documents(db: AsyncSession, kind: str, item_ids: Iterable[str]) -> None:
+    item_ids = list(item_ids)
+    if not SEARCH_ENABLED or not item_ids:
+        return
+    rowids = (
+        await db.scalars(
+            select(SearchDocument.id).where(SearchDocument.kind == kind, SearchDocument.item_id.in_(item_ids))
+        )
+    ).all()
+    if not rowids:
+        return
+    await db.execute(delete(SearchDocument).where(SearchDocument.id.in_(rowids)))
+    await db.execute(delete(search_index).where(search_index.c.rowid.in_(rowids)))
+
+
+async def retitle_document(db: AsyncSession, kind: str, item_id: str, title: str) -> None:
+    if not SEARCH_ENABLED:
+        return
+    rowid = select(SearchDocument.id).where(SearchDocument.kind == kind, SearchDocument.item_id == item_id)
+    await db.execute(update(search_index).where(search_index.c.rowid == rowid.scalar_subquery()).values(title=title))
+
+
+def match_expression(user_id: str, query: str) -> Optional[str]:
+    """FTS5 query for free text: every word must match, the last one as a prefix (search as you type)."""
+    words = re.findall(r"\w+", query.lower())[:SEARCH_MAX_TERMS]
+    if not words:
+        return None
+    # Quoting each word keeps FTS5 operators and column filters in user input literal.
+    terms = " ".join(f'"{w}"' for w in words) + "*"
+    return f'owner : "{_owner(user_id)}" AND {{title body}} : ({terms})'
+
+
+async def search(
+    db: AsyncSession,
+    user_id: str,
+    query: str,
+    kind: Optional[str],
+    limit: int,
+    offset: int,
+):
+    match = match_expression(user_id, query)
+    if match is None:
+        return []
+
+    stmt = (
+        select(SearchDocument.kind, SearchDocument.item_id, search_index.c.title, SearchDocument.created_at)
+        .select_from(search_index)
+        .join(SearchDocument, SearchDocument.id == search_index.c.rowid)
+        .where(literal_column("search_index").op("MATCH")(bindparam("match", match)))
+        .order_by(_rank, SearchDocument.id)
+        .limit(limit)
+        .offset(offset)
+    )
+    if kind:
+        stmt = stmt.where(SearchDocument.kind == kind)
+    return (await db.execute(stmt)).all()
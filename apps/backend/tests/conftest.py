@@ -0,0 +1,8 @@
+import os
+import sys
+
+# Tests import the backend modules the way main.py does, from the app directory.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("OPENAI_API_KEY", "test")
+os.environ.setdefault("DATABASE_URL", "sqlite:///:memory:")
@@ -0,0 +1,39 @@
+import asyncio
+
+import ai_jobs
+from models import AIJob
+from schemas import AIJobRequest, ProgramRejected
+
+
+def test_pool_keeps_draining_after_finish_fails(monkeypatch):
+    request_json = AIJobRequest(text="3 home workouts a week").model_dump_json()
+    queue = [AIJob(id=job_id, user_id=1, request_json=request_json) for job_id in ("first", "second")]
+    finished, failed = [], []
+
+    async def generate_program(*args, **kwargs):
+        return ProgramRejected(status="rejected", code="TOO_VAGUE", message="", hints=[])
+
+    async def finish(job, payload, result, error):
+        if job.id == "first":
+            raise RuntimeError("database is locked")
+        finished.append(job.id)
+
+    monkeypatch.setattr(ai_jobs, "_claim", lambda: queue.pop(0) if queue else None)
+    monkeypatch.setattr(ai_jobs, "_fail", failed.append)
+    monkeypatch.setattr(ai_jobs, "_finish", finish)
+    monkeypatch.setattr(ai_jobs, "generate_program", generate_program)
+
+    async def drain():
+        pool = ai_jobs.JobWorkerPool(workers=1, poll_seconds=0.01)
+        await pool.start()
+        for _ in range(200):
+            if finished:
+                break
+            await asyncio.sleep(0.01)
+        await pool.stop()
+        return pool
+
+    pool = asyncio.run(drain())
+    assert finished == ["second"]
+    assert failed == ["first"]
+    assert pool.stats == {"claimed": 2, "done": 1, "errors": 1}
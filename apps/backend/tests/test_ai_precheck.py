@@ -0,0 +1,23 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from ai_precheck import precheck
+
+CORPUS = Path(__file__).resolve().parent.parent / "data" / "precheck_corpus.jsonl"
+_rows = [json.loads(line) for line in CORPUS.read_text().splitlines() if line.strip()]
+
+
+@pytest.mark.parametrize("row", [r for r in _rows if r.get("must_pass")], ids=lambda r: r["text"])
+def test_must_pass_rows_reach_the_model(row):
+    assert precheck(row["text"], row.get("preferences")) is None
+
+
+@pytest.mark.parametrize(
+    "text",
+    ["write a python function to reverse a string", "debug my javascript react app", "fix this sql query bug"],
+)
+def test_several_off_topic_signals_are_rejected_locally(text):
+    rejected = precheck(text)
+    assert rejected is not None and rejected.code == "NOT_FITNESS"
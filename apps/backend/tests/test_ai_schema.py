@@ -0,0 +1,86 @@
+import asyncio
+from types import SimpleNamespace
+from typing import Literal, get_args, get_origin
+
+import annotated_types
+import pytest
+
+import ai
+from schemas import DayProgram, Exercise, ProgramOK, ProgramRejected
+
+
+@pytest.fixture
+def sent_schema(monkeypatch):
+    """The JSON schema the generation call actually sends, captured from a stubbed client."""
+    captured = {}
+
+    async def create(**kwargs):
+        captured.update(kwargs)
+        return SimpleNamespace(status="completed", output_text="", usage=None)
+
+    monkeypatch.setattr(ai, "client", SimpleNamespace(responses=SimpleNamespace(create=create)))
+    asyncio.run(ai._call_llm(ai.SYSTEM, "3 day strength plan", max_output_tokens=1000))
+
+    fmt = captured["text"]["format"]
+    assert fmt["type"] == "json_schema"
+    assert fmt["strict"] is True
+    return fmt["schema"]
+
+
+def _walk(node):
+    if isinstance(node, dict):
+        yield node
+        for value in node.values():
+            yield from _walk(value)
+    elif isinstance(node, list):
+        for value in node:
+            yield from _walk(value)
+
+
+def test_root_wraps_the_program_union(sent_schema):
+    assert sent_schema["type"] == "object"
+    assert sent_schema["required"] == [ai.RESPONSE_KEY]
+    assert sent_schema["additionalProperties"] is False
+    refs = {option["$ref"] for option in sent_schema["properties"][ai.RESPONSE_KEY]["anyOf"]}
+    assert refs == {"#/$defs/ProgramOK", "#/$defs/ProgramRejected"}
+
+
+def test_every_object_is_closed_and_fully_required(sent_schema):
+    objects = [node for node in _walk(sent_schema) if node.get("type") == "object"]
+    assert objects
+    for node in objects:
+        assert node["additionalProperties"] is False
+        assert set(node["required"]) == set(node.get("properties", {}))
+
+
+def test_no_keywords_strict_mode_rejects(sent_schema):
+    for node in _walk(sent_schema):
+        assert "default" not in node
+        assert "const" not in node
+
+
+@pytest.mark.parametrize("model", [ProgramOK, ProgramRejected, DayProgram, Exercise])
+def test_model_fields_bounds_and_enums(sent_schema, model):
+    definition = sent_schema["$defs"][model.__name__]
+    assert set(definition["properties"]) == set(model.model_fields)
+
+    for name, field in model.model_fields.items():
+        prop = definition["properties"][name]
+        if get_origin(field.annotation) is Literal:
+            assert prop["enum"] == list(get_args(field.annotation))
+        for constraint in field.metadata:
+            if isinstance(constraint, annotated_types.Ge):
+                assert prop["minimum"] == constraint.ge
+            if isinstance(constraint, annotated_types.Le):
+                assert prop["maximum"] == constraint.le
+
+
+def test_rejection_codes_and_bounds_match_the_models(sent_schema):
+    defs = sent_schema["$defs"]
+    assert defs["ProgramRejected"]["properties"]["code"]["enum"] == ["NOT_FITNESS", "TOO_VAGUE"]
+    assert defs["ProgramOK"]["properties"]["status"]["enum"] == ["ok"]
+    day = defs["DayProgram"]["properties"]
+    assert (day["day"]["minimum"], day["day"]["maximum"]) == (1, 14)
+    assert day["intensity"]["enum"] == ["low", "medium", "high"]
+    sets = defs["Exercise"]["properties"]["sets"]
+    assert (sets["minimum"], sets["maximum"]) == (1, 10)
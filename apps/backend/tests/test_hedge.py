@@ -0,0 +1,38 @@
+import asyncio
+
+from core.hedge import Hedger
+
+
+def _run(hedger: Hedger, fn):
+    return asyncio.run(hedger.run(fn))
+
+
+def test_primary_cancelled_by_a_winning_hedge_is_recorded():
+    hedger = Hedger(delay_ms="20", max_fraction=1.0)
+    calls = 0
+
+    async def call():
+        nonlocal calls
+        calls += 1
+        # The primary stalls; the hedge answers straight away.
+        await asyncio.sleep(10 if calls == 1 else 0)
+        return calls
+
+    assert _run(hedger, call) == 2
+    assert hedger.stats["won"] == 1
+    # Both attempts are recorded, the cancelled primary with at least the hedge delay.
+    assert len(hedger._latencies) == 2
+    assert max(hedger._latencies) >= 0.02
+
+
+def test_failed_primary_is_recorded():
+    hedger = Hedger(delay_ms="0", max_fraction=0.0)
+
+    async def call():
+        raise RuntimeError("upstream")
+
+    try:
+        _run(hedger, call)
+    except RuntimeError:
+        pass
+    assert len(hedger._latencies) == 1
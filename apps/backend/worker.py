@@ -0,0 +1,33 @@
+from dotenv import load_dotenv
+load_dotenv()
+
+import argparse
+import asyncio
+
+from ai_jobs import AI_JOB_POLL_SECONDS, AI_JOB_WORKERS, JobWorkerPool
+from db import Base, engine
+
+
+async def run(workers: int) -> None:
+    pool = JobWorkerPool(workers=workers, poll_seconds=AI_JOB_POLL_SECONDS)
+    await pool.start()
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await pool.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Drain the AI job queue outside the web process.")
+    parser.add_argument("--workers", type=int, default=AI_JOB_WORKERS or 4)
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    try:
+        asyncio.run(run(args.workers))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+import json
+from collections import Counter
+from datetime import datetime
+from typing import Dict, Optional
+
+from sqlalchemy import case, delete, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from db import upsert_insert
+from exercise_catalog import catalog_key, display_name
+from models import User, WorkoutExerciseCount, WorkoutStats
+
+STATS_TOP_EXERCISES = 10
+
+STAT_COLUMNS = ("programs", "sessions", "sets", "minutes", "calories", "low_days", "medium_days", "high_days")
+
+
+class StatsDelta:
+    """Change to a user's aggregates from programs being added (times > 0) or removed (times < 0)."""
+
+    def __init__(self):
+        self.totals: Counter = Counter()
+        self.exercises: Counter = Counter()
+        self.names: Dict[str, str] = {}
+
+    def __bool__(self) -> bool:
+        return bool(self.totals) or bool(self.exercises)
+
+    def add_program(self, program_text: Optional[str], times: int = 1) -> None:
+        program = json.loads(program_text) if program_text else {}
+        if program.get("status") != "ok":
+            return
+        totals = self.totals
+        totals["programs"] += times
+        for day in program["days"]:
+            totals["sessions"] += times
+            totals["minutes"] += day["duration_minutes"] * times
+            totals["calories"] += day["estimated_calories"] * times
+            totals[f"{day['intensity']}_days"] += times
+            for exercise in day["exercises"]:
+                totals["sets"] += exercise["sets"] * times
+                key = catalog_key(exercise["name"])
+                if key:
+                    self.exercises[key] += times
+                    self.names.setdefault(key, display_name(exercise["name"]))
+
+
+async def apply_stats(db: AsyncSession, user_id: str, delta: StatsDelta) -> None:
+    if not delta:
+        return
+    # Totals of a user not yet backfilled would miss the programs saved before them.
+    if not await db.scalar(select(User.stats_backfilled).where(User.id == user_id)):
+        return
+
+    now = datetime.utcnow()
+    if any(n < 0 for n in delta.totals.values()):
+        # Removals only touch an existing row and never take a total below zero.
+        values = {}
+        for c in STAT_COLUMNS:
+            total = getattr(WorkoutStats, c) + delta.totals[c]
+            values[c] = case((total < 0, 0), else_=total)
+        await db.execute(update(WorkoutStats).where(WorkoutStats.user_id == user_id).values(updated_at=now, **values))
+    else:
+        stmt = upsert_insert(WorkoutStats).values(
+            user_id=user_id, updated_at=now, **{c: delta.totals[c] for c in STAT_COLUMNS}
+        )
+        await db.execute(
+            stmt.on_conflict_do_update(
+                index_elements=[WorkoutStats.user_id],
+                set_={
+                    **{c: getattr(WorkoutStats, c) + getattr(stmt.excluded, c) for c in STAT_COLUMNS},
+                    "updated_at": stmt.excluded.updated_at,
+                },
+            )
+        )
+
+    changed = sorted(k for k, n in delta.exercises.items() if n)
+    if not changed:
+        return
+    stmt = upsert_insert(WorkoutExerciseCount).values(
+        [{"user_id": user_id, "key": k, "name": delta.names[k], "count": delta.exercises[k]} for k in changed]
+    )
+    await db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[WorkoutExerciseCount.user_id, WorkoutExerciseCount.key],
+            set_={"count": WorkoutExerciseCount.count + stmt.excluded.count},
+        )
+    )
+    if any(delta.exercises[k] < 0 for k in changed):
+        await db.execute(
+            delete(WorkoutExerciseCount).where(
+                WorkoutExerciseCount.user_id == user_id,
+                WorkoutExerciseCount.key.in_(changed),
+                WorkoutExerciseCount.count <= 0,
+            )
+        )
+
+
+async def read_stats(db: AsyncSession, user_id: str):
+    """The user's totals row (None before the first save) and most frequent exercises."""
+    totals = await db.scalar(select(WorkoutStats).where(WorkoutStats.user_id == user_id))
+    top = (
+        await db.execute(
+            select(WorkoutExerciseCount.name, WorkoutExerciseCount.count)
+            .where(WorkoutExerciseCount.user_id == user_id)
+            .order_by(WorkoutExerciseCount.count.desc(), WorkoutExerciseCount.key)
+            .limit(STATS_TOP_EXERCISES)
+        )
+    ).all()
+    return totals, top
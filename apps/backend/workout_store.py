@@ -0,0 +1,176 @@
+import hashlib
+import json
+from collections import Counter
+from datetime import datetime
+from typing import Optional, Dict, Any, List, Tuple
+
+from pydantic import TypeAdapter
+from sqlalchemy import delete, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from exercise_catalog import program_exercise_names, record_exercises
+from models import ProgramBody, WorkoutProgram, uuid_str
+from schemas import ProgramResponse, SaveWorkoutRequest
+from search import index_documents, remove_documents, workout_doc
+from workout_stats import StatsDelta, apply_stats
+
+_program_adapter = TypeAdapter(ProgramResponse)
+
+
+def program_body(program: ProgramResponse) -> Tuple[str, str]:
+    """Canonical JSON of a validated program and its content hash."""
+    body = _program_adapter.dump_json(program).decode("utf-8")
+    return hashlib.sha256(body.encode("utf-8")).hexdigest(), body
+
+
+async def acquire_body(db: AsyncSession, program_hash: str, body: str, count: int = 1) -> None:
+    bumped = await db.execute(
+        update(ProgramBody)
+        .where(ProgramBody.hash == program_hash)
+        .values(ref_count=ProgramBody.ref_count + count)
+    )
+    if bumped.rowcount:
+        return
+
+    try:
+        async with db.begin_nested():
+            db.add(ProgramBody(hash=program_hash, body=body, ref_count=count))
+    except IntegrityError:
+        # A concurrent save inserted the same body first; take a reference on it instead.
+        await db.execute(
+            update(ProgramBody)
+            .where(ProgramBody.hash == program_hash)
+            .values(ref_count=ProgramBody.ref_count + count)
+        )
+
+
+async def release_body(db: AsyncSession, program_hash: Optional[str], count: int = 1) -> None:
+    if not program_hash:
+        return
+    await db.execute(
+        update(ProgramBody)
+        .where(ProgramBody.hash == program_hash)
+        .values(ref_count=ProgramBody.ref_count - count)
+    )
+    await db.execute(delete(ProgramBody).where(ProgramBody.hash == program_hash, ProgramBody.ref_count <= 0))
+
+
+async def create_workout(
+    db: AsyncSession,
+    user_id: str,
+    title: str,
+    input_text: Optional[str],
+    preferences: Optional[Dict[str, Any]],
+    program: ProgramResponse,
+) -> WorkoutProgram:
+    program_hash, body = program_body(program)
+    await acquire_body(db, program_hash, body)
+
+    # id and created_at are set up front so the search entry can be written in the same transaction.
+    row = WorkoutProgram(
+        id=uuid_str(),
+        user_id=user_id,
+        title=title,
+        input_text=input_text,
+        preferences_json=json.dumps(preferences),
+        program_hash=program_hash,
+        created_at=datetime.utcnow(),
+    )
+    db.add(row)
+    await index_documents(db, [workout_doc(row.id, user_id, title, input_text, body, row.created_at)])
+    await record_exercises(db, user_id, program_exercise_names(program))
+
+    delta = StatsDelta()
+    delta.add_program(body)
+    await apply_stats(db, user_id, delta)
+    return row
+
+
+async def create_workouts(
+    db: AsyncSession,
+    user_id: str,
+    items: List[SaveWorkoutRequest],
+) -> List[WorkoutProgram]:
+    """Bulk create_workout: one reference bump per distinct program instead of one per item."""
+    hashed = [program_body(item.program) for item in items]
+    bodies = dict(hashed)
+    for program_hash, count in Counter(h for h, _ in hashed).items():
+        await acquire_body(db, program_hash, bodies[program_hash], count)
+
+    rows = [
+        WorkoutProgram(
+            id=uuid_str(),
+            user_id=user_id,
+            title=item.title,
+            input_text=item.input_text,
+            preferences_json=json.dumps(item.preferences.model_dump() if item.preferences else None),
+            program_hash=program_hash,
+            # Per row, so imports keep their line order in created_at-ordered listings and exports.
+            created_at=datetime.utcnow(),
+        )
+        for item, (program_hash, _) in zip(items, hashed)
+    ]
+    db.add_all(rows)
+    await index_documents(
+        db,
+        [
+            workout_doc(row.id, user_id, row.title, row.input_text, body, row.created_at)
+            for row, (_, body) in zip(rows, hashed)
+        ],
+    )
+    await record_exercises(db, user_id, [name for item in items for name in program_exercise_names(item.program)])
+
+    delta = StatsDelta()
+    for program_hash, count in Counter(h for h, _ in hashed).items():
+        delta.add_program(bodies[program_hash], count)
+    await apply_stats(db, user_id, delta)
+    return rows
+
+
+async def remove_workout(db: AsyncSession, row: WorkoutProgram) -> None:
+    delta = StatsDelta()
+    delta.add_program(row.program_text, -1)
+    await apply_stats(db, row.user_id, delta)
+
+    program_hash = row.program_hash
+    await remove_documents(db, "workout", [row.id])
+    await db.delete(row)
+    # The row goes first so its body is never deleted while still referenced.
+    await db.flush()
+    await release_body(db, program_hash)
+
+
+async def remove_workouts(db: AsyncSession, user_id: str, ids: List[str]) -> List[str]:
+    """Deletes the user's workouts among ids and returns the ids that were actually removed."""
+    rows = (
+        await db.execute(
+            select(WorkoutProgram.id, WorkoutProgram.program_hash, WorkoutProgram.program_json).where(
+                WorkoutProgram.user_id == user_id, WorkoutProgram.id.in_(ids)
+            )
+        )
+    ).all()
+    if not rows:
+        return []
+
+    # Bodies are read once per distinct program, before their references are released.
+    shared = Counter(r.program_hash for r in rows if r.program_hash)
+    bodies = dict(
+        (await db.execute(select(ProgramBody.hash, ProgramBody.body).where(ProgramBody.hash.in_(shared)))).all()
+    )
+    delta = StatsDelta()
+    for program_hash, count in shared.items():
+        delta.add_program(bodies.get(program_hash), -count)
+    for r in rows:
+        if not r.program_hash:
+            delta.add_program(r.program_json, -1)
+    await apply_stats(db, user_id, delta)
+
+    found = [r.id for r in rows]
+    await remove_documents(db, "workout", found)
+    await db.execute(
+        delete(WorkoutProgram).where(WorkoutProgram.id.in_(found)).execution_options(synchronize_session=False)
+    )
+    for program_hash, count in shared.items():
+        await release_body(db, program_hash, count)
+    return found